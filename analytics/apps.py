@@ -0,0 +1,29 @@
+from django.apps import AppConfig
+
+
+class AnalyticsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analytics'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from applications.models import FoodApplication
+        from applications.signals import application_status_changed
+        from listings.models import FoodListing
+        from listings.signals import listings_created, listings_status_changed
+        from . import receivers
+
+        listings_created.connect(receivers.listings_created, dispatch_uid='analytics_listings_created')
+        listings_status_changed.connect(
+            receivers.listings_status_changed, dispatch_uid='analytics_listings_status_changed'
+        )
+        post_delete.connect(receivers.listing_deleted, sender=FoodListing, dispatch_uid='analytics_listing_deleted')
+        post_save.connect(
+            receivers.application_created, sender=FoodApplication, dispatch_uid='analytics_application_created'
+        )
+        post_delete.connect(
+            receivers.application_deleted, sender=FoodApplication, dispatch_uid='analytics_application_deleted'
+        )
+        application_status_changed.connect(
+            receivers.application_status_changed, dispatch_uid='analytics_application_status_changed'
+        )
@@ -0,0 +1,100 @@
+"""
+Platform-wide metrics for the admin dashboard.
+
+Each section is one grouped aggregate query, so the cost depends on the
+number of distinct groups (roles, statuses, plans), never on the number of
+rows behind them.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Sum
+
+from applications.models import FoodApplication
+from listings.models import FoodListing
+from payments.models import PaymentTransaction
+from support.models import SupportTicket
+
+User = get_user_model()
+
+
+def _ratio(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def user_metrics():
+    by_role = {role: {'total': 0, 'verified': 0, 'unverified': 0} for role in User.Role.values}
+    rows = User.objects.values('role', 'is_verified').annotate(n=Count('id')).order_by()
+    for row in rows:
+        bucket = by_role.setdefault(row['role'], {'total': 0, 'verified': 0, 'unverified': 0})
+        bucket['total'] += row['n']
+        bucket['verified' if row['is_verified'] else 'unverified'] += row['n']
+    return {'total': sum(bucket['total'] for bucket in by_role.values()), 'by_role': by_role}
+
+
+def listing_metrics():
+    by_status = dict.fromkeys(FoodListing.Status.values, 0)
+    by_category = dict.fromkeys(FoodListing.Category.values, 0)
+    rows = FoodListing.objects.values('status', 'category').annotate(n=Count('id')).order_by()
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['n']
+        by_category[row['category']] = by_category.get(row['category'], 0) + row['n']
+    return {'total': sum(by_status.values()), 'by_status': by_status, 'by_category': by_category}
+
+
+def application_metrics():
+    Status = FoodApplication.Status
+    by_status = dict.fromkeys(Status.values, 0)
+    rows = FoodApplication.objects.values('status').annotate(n=Count('id')).order_by()
+    by_status.update((row['status'], row['n']) for row in rows)
+    total = sum(by_status.values())
+    approved = by_status[Status.APPROVED] + by_status[Status.COLLECTED]
+    decided = approved + by_status[Status.REJECTED]
+    return {
+        'total': total,
+        'by_status': by_status,
+        'funnel': {
+            'submitted': total,
+            'approved': approved,
+            'collected': by_status[Status.COLLECTED],
+            'approval_rate': _ratio(approved, decided),
+            'pickup_rate': _ratio(by_status[Status.COLLECTED], approved),
+            'conversion_rate': _ratio(by_status[Status.COLLECTED], total),
+        },
+    }
+
+
+def ticket_metrics():
+    Status = SupportTicket.Status
+    by_status = dict.fromkeys(Status.values, 0)
+    rows = SupportTicket.objects.values('status').annotate(n=Count('id')).order_by()
+    by_status.update((row['status'], row['n']) for row in rows)
+    return {'open': by_status[Status.OPEN] + by_status[Status.IN_PROGRESS], 'by_status': by_status}
+
+
+def revenue_metrics():
+    rows = PaymentTransaction.objects.filter(status=PaymentTransaction.Status.SUCCESS).values(
+        'plan_id', 'plan__name', 'currency'
+    ).annotate(amount=Sum('amount'), payments=Count('id')).order_by('plan_id', 'currency')
+    totals = defaultdict(int)
+    by_plan = []
+    for row in rows:
+        totals[row['currency']] += row['amount']
+        by_plan.append({
+            'plan_id': row['plan_id'],
+            'plan': row['plan__name'],
+            'currency': row['currency'],
+            'amount': row['amount'],
+            'payments': row['payments'],
+        })
+    return {'total': dict(totals), 'by_plan': by_plan}
+
+
+def platform_metrics():
+    return {
+        'users': user_metrics(),
+        'listings': listing_metrics(),
+        'applications': application_metrics(),
+        'support_tickets': ticket_metrics(),
+        'revenue': revenue_metrics(),
+    }
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recomputes the precomputed provider statistics from listings and applications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', type=int, action='append', dest='providers', help='Limit to provider ids.')
+
+    def handle(self, *args, **options):
+        count = rebuild(options['providers'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} providers.'))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('users', '0003_user_user_joined_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderStats',
+            fields=[
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('listings_total', models.IntegerField(default=0)),
+                ('listings_available', models.IntegerField(default=0)),
+                ('listings_pending', models.IntegerField(default=0)),
+                ('listings_collected', models.IntegerField(default=0)),
+                ('listings_expired', models.IntegerField(default=0)),
+                ('applications_received', models.IntegerField(default=0)),
+                ('applications_approved', models.IntegerField(default=0)),
+                ('applications_collected', models.IntegerField(default=0)),
+                ('units_collected', models.IntegerField(default=0)),
+                ('beneficiaries_served', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProviderDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('listings_created', models.IntegerField(default=0)),
+                ('applications_received', models.IntegerField(default=0)),
+                ('applications_approved', models.IntegerField(default=0)),
+                ('applications_collected', models.IntegerField(default=0)),
+                ('units_collected', models.IntegerField(default=0)),
+                ('beneficiaries_served', models.IntegerField(default=0)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('provider', 'day'), name='provider_daily_stats_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    # Without this every provider's analytics read zero until the first rebuild_provider_stats.
+    from analytics import rollups
+
+    rollups.rebuild(apps=apps)
+
+
+def clear(apps, schema_editor):
+    apps.get_model('analytics', 'ProviderStats').objects.all().delete()
+    apps.get_model('analytics', 'ProviderDailyStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('applications', '0006_active_application_unique'),
+        ('listings', '0010_foodlisting_application_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
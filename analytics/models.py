@@ -0,0 +1,43 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+class ProviderStats(models.Model):
+    """Running totals per provider, maintained incrementally by analytics.rollups."""
+    provider = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    listings_total = models.IntegerField(default=0)
+    listings_available = models.IntegerField(default=0)
+    listings_pending = models.IntegerField(default=0)
+    listings_collected = models.IntegerField(default=0)
+    listings_expired = models.IntegerField(default=0)
+    applications_received = models.IntegerField(default=0)
+    # Approved at some point and not revoked, so collected ones are included.
+    applications_approved = models.IntegerField(default=0)
+    applications_collected = models.IntegerField(default=0)
+    units_collected = models.IntegerField(default=0)
+    beneficiaries_served = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.provider_id}"
+
+
+class ProviderDailyStats(models.Model):
+    provider = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    listings_created = models.IntegerField(default=0)
+    applications_received = models.IntegerField(default=0)
+    applications_approved = models.IntegerField(default=0)
+    applications_collected = models.IntegerField(default=0)
+    units_collected = models.IntegerField(default=0)
+    beneficiaries_served = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'day'], name='provider_daily_stats_unique'),
+        ]
+
+    def __str__(self):
+        return f"Stats for {self.provider_id} on {self.day}"
@@ -0,0 +1,65 @@
+from collections import Counter, defaultdict
+
+from applications.models import FoodApplication
+
+from . import rollups
+
+
+def listings_created(sender, listings, **kwargs):
+    for provider_id, count in Counter(listing.provider_id for listing in listings).items():
+        totals = {'listings_total': count}
+        totals.update(rollups.listing_status_deltas(None, sender.Status.AVAILABLE, count))
+        rollups.record(provider_id, totals, daily={'listings_created': count})
+
+
+def listings_status_changed(sender, old_status, new_status, provider_counts, **kwargs):
+    for provider_id, count in provider_counts.items():
+        rollups.record(provider_id, rollups.listing_status_deltas(old_status, new_status, count))
+
+
+def listing_deleted(sender, instance, **kwargs):
+    totals = {'listings_total': -1}
+    totals.update(rollups.listing_status_deltas(instance.status, None))
+    rollups.record(instance.provider_id, totals)
+
+
+def application_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    rollups.record(
+        instance.listing.provider_id,
+        {'applications_received': 1},
+        daily={'applications_received': 1},
+    )
+
+
+def application_deleted(sender, instance, **kwargs):
+    """Take back what the application added, including when its listing's delete cascades to it."""
+    Status = FoodApplication.Status
+    totals = {'applications_received': -1}
+    if instance.status in (Status.APPROVED, Status.COLLECTED):
+        totals['applications_approved'] = -1
+    if instance.status == Status.COLLECTED:
+        totals['applications_collected'] = -1
+        totals['units_collected'] = -instance.quantity_requested
+        totals['beneficiaries_served'] = -instance.beneficiaries_count
+    rollups.record(instance.listing.provider_id, totals)
+
+
+def application_status_changed(sender, applications, old_status, new_status, **kwargs):
+    Status = FoodApplication.Status
+    # Summed per provider, so a bulk transition costs one counter update per provider.
+    by_provider = defaultdict(Counter)
+    for application in applications:
+        deltas = by_provider[application.listing.provider_id]
+        if new_status == Status.APPROVED:
+            deltas['applications_approved'] += 1
+        elif old_status == Status.APPROVED and new_status == Status.REJECTED:
+            deltas['applications_approved'] -= 1
+        elif new_status == Status.COLLECTED:
+            deltas['applications_collected'] += 1
+            deltas['units_collected'] += application.quantity_requested
+            deltas['beneficiaries_served'] += application.beneficiaries_count
+    for provider_id, deltas in by_provider.items():
+        if deltas:
+            rollups.record(provider_id, dict(deltas), daily=dict(deltas))
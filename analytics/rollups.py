@@ -0,0 +1,134 @@
+"""
+Incremental provider statistics.
+
+Every state transition adds or subtracts from the provider's counters with an
+``UPDATE ... SET n = n + delta``, so concurrent events never lose updates and
+reading the analytics is a primary key lookup. ``rebuild()`` recomputes
+everything from the source tables with grouped aggregates, for backfills and
+repairs.
+"""
+from collections import defaultdict
+
+from django.apps import apps as global_apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from applications.models import FoodApplication
+from listings.models import FoodListing
+
+from .models import ProviderDailyStats, ProviderStats
+
+LISTING_STATUS_FIELDS = {
+    FoodListing.Status.AVAILABLE: 'listings_available',
+    FoodListing.Status.PENDING: 'listings_pending',
+    FoodListing.Status.COLLECTED: 'listings_collected',
+    FoodListing.Status.EXPIRED: 'listings_expired',
+}
+
+
+def bump(model, lookup, deltas):
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Someone else created the row first.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def record(provider_id, totals=None, daily=None, day=None):
+    bump(ProviderStats, {'provider_id': provider_id}, totals or {})
+    if daily:
+        bump(ProviderDailyStats, {'provider_id': provider_id, 'day': day or timezone.localdate()}, daily)
+
+
+def listing_status_deltas(old_status, new_status, count=1):
+    deltas = defaultdict(int)
+    if old_status in LISTING_STATUS_FIELDS:
+        deltas[LISTING_STATUS_FIELDS[old_status]] -= count
+    if new_status in LISTING_STATUS_FIELDS:
+        deltas[LISTING_STATUS_FIELDS[new_status]] += count
+    return deltas
+
+
+def rebuild(provider_ids=None, apps=global_apps):
+    """
+    Recompute ProviderStats and ProviderDailyStats from listings and
+    applications. Migrations pass their historical ``apps``.
+    """
+    listings = apps.get_model('listings', 'FoodListing').objects.all()
+    applications = apps.get_model('applications', 'FoodApplication').objects.all()
+    stats_model = apps.get_model('analytics', 'ProviderStats')
+    daily_model = apps.get_model('analytics', 'ProviderDailyStats')
+    if provider_ids is not None:
+        listings = listings.filter(provider_id__in=provider_ids)
+        applications = applications.filter(listing__provider_id__in=provider_ids)
+
+    approved = Q(status__in=[FoodApplication.Status.APPROVED, FoodApplication.Status.COLLECTED])
+    collected = Q(status=FoodApplication.Status.COLLECTED)
+    totals = defaultdict(lambda: defaultdict(int))
+    daily = defaultdict(lambda: defaultdict(int))
+
+    for row in listings.values('provider_id', 'status').annotate(n=Count('id')).order_by():
+        totals[row['provider_id']]['listings_total'] += row['n']
+        if row['status'] in LISTING_STATUS_FIELDS:
+            totals[row['provider_id']][LISTING_STATUS_FIELDS[row['status']]] += row['n']
+
+    application_sums = dict(
+        applications_received=Count('id'),
+        applications_approved=Count('id', filter=approved),
+        applications_collected=Count('id', filter=collected),
+        units_collected=Sum('quantity_requested', filter=collected, default=0),
+        beneficiaries_served=Sum('beneficiaries_count', filter=collected, default=0),
+    )
+    for row in applications.values(provider_id=F('listing__provider_id')).annotate(**application_sums).order_by():
+        totals[row.pop('provider_id')].update(row)
+
+    for row in listings.annotate(day=TruncDate('created_at')).values('provider_id', 'day').annotate(
+        n=Count('id')
+    ).order_by():
+        daily[(row['provider_id'], row['day'])]['listings_created'] = row['n']
+    for row in applications.annotate(day=TruncDate('created_at')).values(
+        'day', provider_id=F('listing__provider_id')
+    ).annotate(n=Count('id')).order_by():
+        daily[(row['provider_id'], row['day'])]['applications_received'] = row['n']
+    # Applications don't keep per-transition timestamps, so approvals and
+    # pickups are bucketed by their last update.
+    for row in applications.filter(approved).annotate(day=TruncDate('updated_at')).values(
+        'day', provider_id=F('listing__provider_id')
+    ).annotate(
+        applications_approved=Count('id'),
+        applications_collected=Count('id', filter=collected),
+        units_collected=Sum('quantity_requested', filter=collected, default=0),
+        beneficiaries_served=Sum('beneficiaries_count', filter=collected, default=0),
+    ).order_by():
+        key = (row.pop('provider_id'), row.pop('day'))
+        daily[key].update(row)
+
+    with transaction.atomic():
+        stats = stats_model.objects.all()
+        daily_stats = daily_model.objects.all()
+        if provider_ids is not None:
+            stats = stats.filter(provider_id__in=provider_ids)
+            daily_stats = daily_stats.filter(provider_id__in=provider_ids)
+        stats.delete()
+        daily_stats.delete()
+        stats_model.objects.bulk_create(
+            [stats_model(provider_id=provider_id, **values) for provider_id, values in totals.items()],
+            batch_size=1000,
+        )
+        daily_model.objects.bulk_create(
+            [
+                daily_model(provider_id=provider_id, day=day, **values)
+                for (provider_id, day), values in daily.items()
+            ],
+            batch_size=1000,
+        )
+    return len(totals)
@@ -0,0 +1,219 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from applications.models import FoodApplication
+from food_connect_project.testing import apply, create_listing, create_user
+from listings.expiry import expire_listings
+from listings.models import FoodListing
+from payments.models import PaymentTransaction, SubscriptionPlan
+from support.models import SupportTicket
+
+from .models import ProviderDailyStats, ProviderStats
+
+User = get_user_model()
+
+STAT_FIELDS = [
+    'listings_total', 'listings_available', 'listings_pending', 'listings_collected', 'listings_expired',
+    'applications_received', 'applications_approved', 'applications_collected',
+    'units_collected', 'beneficiaries_served',
+]
+DAILY_FIELDS = [
+    'day', 'listings_created', 'applications_received', 'applications_approved',
+    'applications_collected', 'units_collected', 'beneficiaries_served',
+]
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False, 'BATCH_SIZE': 100}, MATCHING={'ASYNC': False})
+class ProviderStatsTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+
+    def create_listing(self, units=5):
+        self.client.force_authenticate(self.provider)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/listings/', {
+                'title': 'Meals',
+                'description': 'Hot meals',
+                'quantity': f'{units} plates',
+                'quantity_available': units,
+                'expiry_date': (timezone.now() + timedelta(days=1)).isoformat(),
+            })
+        self.assertEqual(response.status_code, 201)
+        return FoodListing.objects.get(pk=response.data['id'])
+
+    def apply(self, listing, units, beneficiaries):
+        application = apply(listing, quantity_requested=units, beneficiaries_count=beneficiaries)
+        return application.seeker, application
+
+    def set_status(self, application, status):
+        self.client.force_authenticate(self.provider)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/applications/{application.id}/update_status/', {'status': status})
+        self.assertEqual(response.status_code, 200)
+
+    def confirm_pickup(self, seeker, application):
+        self.client.force_authenticate(seeker)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/applications/{application.id}/confirm_pickup/')
+        self.assertEqual(response.status_code, 200)
+
+    def snapshot(self):
+        stats = ProviderStats.objects.filter(provider=self.provider).values(*STAT_FIELDS).first()
+        daily = list(ProviderDailyStats.objects.filter(provider=self.provider).order_by('day').values(*DAILY_FIELDS))
+        return stats, daily
+
+    def run_lifecycle(self):
+        listing = self.create_listing(units=5)
+        self.create_listing(units=2)
+        seeker, collected = self.apply(listing, 3, beneficiaries=4)
+        _, approved = self.apply(listing, 2, beneficiaries=2)
+        _, rejected = self.apply(listing, 1, beneficiaries=1)
+        self.set_status(collected, 'APPROVED')
+        self.set_status(approved, 'APPROVED')
+        self.set_status(rejected, 'REJECTED')
+        self.confirm_pickup(seeker, collected)
+
+    def test_transitions_update_counters(self):
+        self.run_lifecycle()
+        stats, daily = self.snapshot()
+        self.assertEqual(stats, {
+            'listings_total': 2,
+            'listings_available': 1,
+            'listings_pending': 1,
+            'listings_collected': 0,
+            'listings_expired': 0,
+            'applications_received': 3,
+            'applications_approved': 2,
+            'applications_collected': 1,
+            'units_collected': 3,
+            'beneficiaries_served': 4,
+        })
+        self.assertEqual(len(daily), 1)
+        self.assertEqual(daily[0]['listings_created'], 2)
+        self.assertEqual(daily[0]['beneficiaries_served'], 4)
+
+    def test_expiry_sweep_updates_counters(self):
+        listing = self.create_listing()
+        FoodListing.objects.filter(pk=listing.pk).update(expiry_date=timezone.now() - timedelta(hours=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_listings()
+        stats, _ = self.snapshot()
+        self.assertEqual(stats['listings_available'], 0)
+        self.assertEqual(stats['listings_expired'], 1)
+
+    def test_rebuild_matches_incremental_counters(self):
+        self.run_lifecycle()
+        incremental = self.snapshot()
+        ProviderStats.objects.all().delete()
+        ProviderDailyStats.objects.all().delete()
+        call_command('rebuild_provider_stats', stdout=StringIO())
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_deleting_applications_and_listings_takes_their_counts_back(self):
+        self.run_lifecycle()
+        collected = FoodApplication.objects.get(status=FoodApplication.Status.COLLECTED)
+        collected.delete()
+        FoodListing.objects.filter(applications__isnull=False).distinct().delete()
+        incremental, _ = self.snapshot()
+        self.assertEqual(incremental['applications_received'], 0)
+        self.assertEqual(incremental['units_collected'], 0)
+        call_command('rebuild_provider_stats', stdout=StringIO())
+        self.assertEqual(self.snapshot()[0], incremental)
+
+    def test_migration_backfills_existing_providers(self):
+        self.run_lifecycle()
+        incremental = self.snapshot()
+        ProviderStats.objects.all().delete()
+        ProviderDailyStats.objects.all().delete()
+        migration = import_module('analytics.migrations.0002_backfill_provider_stats')
+        migration.backfill(apps, None)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_analytics_endpoint_reads_precomputed_row(self):
+        self.run_lifecycle()
+        self.client.force_authenticate(self.provider)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/listings/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_listings'], 2)
+        self.assertEqual(response.data['active_listings'], 1)
+        self.assertEqual(response.data['total_meals_donated'], 3)
+        self.assertEqual(response.data['beneficiaries_served'], 4)
+        self.assertEqual(response.data['listings_by_status']['PENDING'], 1)
+        self.assertEqual(len(response.data['daily']), 1)
+
+    def test_analytics_without_activity_returns_zeros(self):
+        self.client.force_authenticate(self.provider)
+        response = self.client.get('/api/listings/analytics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_listings'], 0)
+        self.assertEqual(response.data['daily'], [])
+
+
+class AdminDashboardTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', password='pass12345', role=User.Role.ADMIN, is_staff=True
+        )
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER, is_verified=True
+        )
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00')
+
+    def add_rows(self, count):
+        for i in range(count):
+            seeker = create_user()
+            listing = create_listing(self.provider, title=f'Listing {i}', category=FoodListing.Category.COOKED)
+            status = FoodApplication.Status.COLLECTED if i % 2 else FoodApplication.Status.REJECTED
+            apply(listing, seeker, status=status)
+            SupportTicket.objects.create(user=seeker, subject='Help', message='Help')
+            PaymentTransaction.objects.create(
+                user=seeker, plan=self.plan, amount=self.plan.price, status=PaymentTransaction.Status.SUCCESS
+            )
+
+    def get_dashboard(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/analytics/admin/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_metrics(self):
+        self.add_rows(4)
+        data = self.get_dashboard()
+        self.assertEqual(data['users']['total'], 6)
+        self.assertEqual(data['users']['by_role']['SEEKER'], {'total': 4, 'verified': 0, 'unverified': 4})
+        self.assertEqual(data['users']['by_role']['PROVIDER']['verified'], 1)
+        self.assertEqual(data['listings']['by_status']['AVAILABLE'], 4)
+        self.assertEqual(data['listings']['by_category']['COOKED'], 4)
+        funnel = data['applications']['funnel']
+        self.assertEqual((funnel['submitted'], funnel['approved'], funnel['collected']), (4, 2, 2))
+        self.assertEqual(funnel['approval_rate'], 0.5)
+        self.assertEqual(funnel['pickup_rate'], 1.0)
+        self.assertEqual(data['support_tickets']['open'], 4)
+        self.assertEqual(data['revenue']['by_plan'][0]['plan'], 'Pro')
+        self.assertEqual(data['revenue']['by_plan'][0]['payments'], 4)
+        self.assertEqual(data['revenue']['total']['USD'], 40)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(1)
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(5):
+            self.client.get('/api/analytics/admin/dashboard/')
+        self.add_rows(5)
+        with self.assertNumQueries(5):
+            self.client.get('/api/analytics/admin/dashboard/')
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.provider)
+        response = self.client.get('/api/analytics/admin/dashboard/')
+        self.assertEqual(response.status_code, 403)
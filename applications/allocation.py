@@ -0,0 +1,245 @@
+"""
+Application status transitions and the listing inventory they consume.
+
+Approving an application reserves ``quantity_requested`` units from
+``FoodListing.quantity_available`` with a conditional UPDATE
+(``... SET quantity_available = quantity_available - n WHERE
+quantity_available >= n``), so two providers' clicks racing for the last
+units can never both succeed. The application's own status change is also a
+conditional UPDATE on its previous status, which makes each transition
+happen exactly once even when the same request is sent twice.
+``bulk_transition()`` moves many applications with one UPDATE and settles
+inventory per listing rather than per application. ``restock()`` is the
+provider's way to add or correct units, with the same kind of conditional
+UPDATE.
+
+The listing's ``pending_applications`` / ``approved_applications`` counters
+move in the same transaction as the application, so provider views read
+them off the listing row instead of aggregating applications. ``recount()``
+(``manage.py recount_applications``) recomputes them from scratch.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from listings import cache as listing_cache
+from listings.models import FoodListing
+from listings.signals import listings_status_changed
+
+from .models import FoodApplication
+from .signals import application_status_changed
+
+Status = FoodApplication.Status
+
+COUNTERS = {
+    Status.PENDING: 'pending_applications',
+    Status.APPROVED: 'approved_applications',
+}
+
+# Largest value FoodListing.quantity_available (a PositiveIntegerField) holds everywhere.
+MAX_UNITS = 2 ** 31 - 1
+
+# new status -> statuses it may be reached from
+TRANSITIONS = {
+    Status.APPROVED: (Status.PENDING,),
+    Status.REJECTED: (Status.PENDING, Status.APPROVED),
+    Status.COLLECTED: (Status.APPROVED,),
+}
+
+
+class TransitionError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def transition(application, new_status):
+    """
+    Move ``application`` to ``new_status``, reserving or releasing listing
+    units as needed. Raises TransitionError when the move isn't allowed or
+    lost a race; nothing is written in that case.
+    """
+    old_status = application.status
+    if new_status not in TRANSITIONS:
+        raise TransitionError('Invalid status')
+    if old_status not in TRANSITIONS[new_status]:
+        raise TransitionError(f'Cannot change a {old_status} application to {new_status}')
+
+    now = timezone.now()
+    with transaction.atomic():
+        claimed = FoodApplication.objects.filter(pk=application.pk, status=old_status).update(
+            status=new_status, updated_at=now
+        )
+        if not claimed:
+            raise TransitionError('Application was updated by someone else, reload and retry', status_code=409)
+
+        if new_status == Status.APPROVED:
+            reserve(application.listing_id, application.quantity_requested)
+        elif old_status == Status.APPROVED and new_status == Status.REJECTED:
+            release(application.listing_id, application.quantity_requested)
+        shift_counts(application.listing_id, old_status, new_status)
+        sync_listing_status(application.listing_id)
+
+        application.status = new_status
+        application.updated_at = now
+        transaction.on_commit(lambda: application_status_changed.send(
+            sender=FoodApplication, applications=[application], old_status=old_status, new_status=new_status,
+        ))
+    return application
+
+
+def bulk_transition(application_ids, new_status, provider=None):
+    """
+    Move every application in ``application_ids`` to ``new_status``, or none
+    of them. ``provider`` limits them to that provider's listings. The
+    applications are loaded and locked with one query and updated with one
+    conditional UPDATE; inventory, counters and listing status are settled
+    once per listing, and ``application_status_changed`` is sent once per
+    previous status. Raises TransitionError (404 for ids that are missing or
+    not the provider's) and writes nothing on failure.
+    """
+    if new_status not in TRANSITIONS:
+        raise TransitionError('Invalid status')
+    allowed = TRANSITIONS[new_status]
+    ids = set(application_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        scope = FoodApplication.objects.filter(pk__in=ids)
+        if provider is not None:
+            scope = scope.filter(listing__provider=provider)
+        # Locking in id order keeps concurrent bulk requests from deadlocking.
+        applications = list(scope.select_related('listing').select_for_update(of=('self',)).order_by('id'))
+        missing = ids - {application.id for application in applications}
+        if missing:
+            raise TransitionError(f'Applications not found: {sorted(missing)}', status_code=404)
+        blocked = [application.id for application in applications if application.status not in allowed]
+        if blocked:
+            raise TransitionError(f'Cannot change applications {blocked} to {new_status}')
+
+        claimed = FoodApplication.objects.filter(pk__in=ids, status__in=allowed).update(
+            status=new_status, updated_at=now
+        )
+        if claimed != len(applications):
+            raise TransitionError('Applications were updated by someone else, reload and retry', status_code=409)
+
+        by_listing = defaultdict(list)
+        for application in applications:
+            by_listing[application.listing_id].append(application)
+        for listing_id in sorted(by_listing):
+            group = by_listing[listing_id]
+            if new_status == Status.APPROVED:
+                reserve(listing_id, sum(application.quantity_requested for application in group))
+            elif new_status == Status.REJECTED:
+                released = sum(a.quantity_requested for a in group if a.status == Status.APPROVED)
+                if released:
+                    release(listing_id, released)
+            for old_status, n in Counter(application.status for application in group).items():
+                shift_counts(listing_id, old_status, new_status, n)
+            sync_listing_status(listing_id)
+
+        by_old_status = defaultdict(list)
+        for application in applications:
+            by_old_status[application.status].append(application)
+            application.status = new_status
+            application.updated_at = now
+        for old_status, moved in by_old_status.items():
+            transaction.on_commit(lambda old_status=old_status, moved=moved: application_status_changed.send(
+                sender=FoodApplication, applications=moved, old_status=old_status, new_status=new_status,
+            ))
+    return applications
+
+
+def reserve(listing_id, units):
+    reserved = FoodListing.objects.filter(
+        pk=listing_id, status=FoodListing.Status.AVAILABLE, quantity_available__gte=units
+    ).update(quantity_available=F('quantity_available') - units, updated_at=timezone.now())
+    if not reserved:
+        raise TransitionError('Not enough quantity left on this listing', status_code=409)
+    # QuerySet.update() skips post_save, so the browse cache has to be told.
+    listing_cache.invalidate()
+
+
+def release(listing_id, units):
+    FoodListing.objects.filter(pk=listing_id).update(
+        quantity_available=F('quantity_available') + units, updated_at=timezone.now()
+    )
+    listing_cache.invalidate()
+
+
+def restock(listing_id, units):
+    """
+    Add ``units`` to a listing's inventory, or take them away when negative,
+    e.g. a provider correcting a miscount. Only AVAILABLE and PENDING
+    listings can be restocked, and never below zero or past the column's
+    maximum. Returns the new ``quantity_available``; raises TransitionError
+    (409) otherwise.
+    """
+    with transaction.atomic():
+        listings = FoodListing.objects.filter(
+            pk=listing_id, status__in=(FoodListing.Status.AVAILABLE, FoodListing.Status.PENDING)
+        )
+        if units < 0:
+            listings = listings.filter(quantity_available__gte=-units)
+        else:
+            listings = listings.filter(quantity_available__lte=MAX_UNITS - units)
+        if not listings.update(quantity_available=F('quantity_available') + units, updated_at=timezone.now()):
+            raise TransitionError('This listing cannot be restocked by that many units', status_code=409)
+        # Units back on an exhausted listing reopen it; taking the last ones away closes it.
+        sync_listing_status(listing_id)
+        listing_cache.invalidate()
+    return FoodListing.objects.values_list('quantity_available', flat=True).get(pk=listing_id)
+
+
+def shift_counts(listing_id, old_status=None, new_status=None, n=1):
+    """Move ``n`` applications of ``listing_id`` between the summary counters."""
+    changes = {}
+    if old_status in COUNTERS:
+        changes[COUNTERS[old_status]] = F(COUNTERS[old_status]) - n
+    if new_status in COUNTERS:
+        field = COUNTERS[new_status]
+        changes[field] = changes.get(field, F(field)) + n
+    if changes:
+        FoodListing.objects.filter(pk=listing_id).update(**changes)
+
+
+def recount(listing_ids=None):
+    """Recompute the summary counters of ``listing_ids`` (every listing by default); returns rows updated."""
+    listings = FoodListing.objects.all() if listing_ids is None else FoodListing.objects.filter(pk__in=listing_ids)
+    return listings.update(**{
+        field: Coalesce(Subquery(
+            FoodApplication.objects.filter(listing_id=OuterRef('pk'), status=status)
+            .values('listing_id').annotate(n=Count('id')).values('n')
+        ), Value(0))
+        for status, field in COUNTERS.items()
+    })
+
+
+def sync_listing_status(listing_id):
+    """
+    Keep the listing status in line with its inventory: exhausted listings
+    go PENDING while approved pickups are outstanding and COLLECTED once they
+    are all done; listings that get units back are AVAILABLE again.
+    """
+    listing = FoodListing.objects.values('status', 'quantity_available', 'provider_id').get(pk=listing_id)
+    old_status = listing['status']
+    if old_status not in (FoodListing.Status.AVAILABLE, FoodListing.Status.PENDING):
+        return
+    if listing['quantity_available'] > 0:
+        new_status = FoodListing.Status.AVAILABLE
+    elif FoodApplication.objects.filter(listing_id=listing_id, status=Status.APPROVED).exists():
+        new_status = FoodListing.Status.PENDING
+    else:
+        new_status = FoodListing.Status.COLLECTED
+    if new_status == old_status:
+        return
+    FoodListing.objects.filter(pk=listing_id, status=old_status).update(status=new_status, updated_at=timezone.now())
+    transaction.on_commit(lambda: listings_status_changed.send(
+        sender=FoodListing,
+        listing_ids=[listing_id],
+        old_status=old_status,
+        new_status=new_status,
+        provider_counts={listing['provider_id']: 1},
+    ))
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class ApplicationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'applications'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .models import FoodApplication
+        from . import receivers
+
+        post_save.connect(
+            receivers.application_created, sender=FoodApplication, dispatch_uid='applications_application_created'
+        )
+        post_delete.connect(
+            receivers.application_deleted, sender=FoodApplication, dispatch_uid='applications_application_deleted'
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from applications.allocation import recount
+
+
+class Command(BaseCommand):
+    help = "Recomputes the pending/approved application counters stored on listings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listing', type=int, action='append', dest='listings', help='Limit to listing ids.')
+
+    def handle(self, *args, **options):
+        count = recount(options['listings'])
+        self.stdout.write(self.style.SUCCESS(f'Recounted applications for {count} listings.'))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0002_foodapplication_beneficiaries_count_and_more'),
+        ('listings', '0003_foodlisting_listing_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodapplication',
+            index=models.Index(fields=['created_at', 'id'], name='application_created_id_idx'),
+        ),
+    ]
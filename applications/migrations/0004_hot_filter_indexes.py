@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0003_foodapplication_application_created_id_idx'),
+        ('listings', '0006_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodapplication',
+            index=models.Index(fields=['seeker', 'created_at', 'id'], name='application_seeker_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodapplication',
+            index=models.Index(fields=['listing', 'status'], name='application_listing_status_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def reject_duplicates(apps, schema_editor):
+    """Keep one active application per (listing, seeker) so the constraint can be added."""
+    FoodApplication = apps.get_model('applications', 'FoodApplication')
+    FoodListing = apps.get_model('listings', 'FoodListing')
+    active = FoodApplication.objects.filter(status__in=['PENDING', 'APPROVED'])
+    pairs = active.values('listing_id', 'seeker_id').annotate(n=Count('id')).filter(n__gt=1).order_by()
+    for pair in pairs:
+        # 'APPROVED' sorts before 'PENDING': an approval wins, then the newest application.
+        keep, *duplicates = active.filter(
+            listing_id=pair['listing_id'], seeker_id=pair['seeker_id']
+        ).order_by('status', '-created_at', '-id')
+        for duplicate in duplicates:
+            if duplicate.status == 'APPROVED':
+                FoodListing.objects.filter(pk=duplicate.listing_id).update(
+                    quantity_available=F('quantity_available') + duplicate.quantity_requested
+                )
+            duplicate.status = 'REJECTED'
+            duplicate.save(update_fields=['status'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0005_foodapplication_quantity_requested'),
+        ('listings', '0009_foodlisting_expiry_alert_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(reject_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='foodapplication',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'APPROVED'])), fields=('listing', 'seeker'), name='application_active_unique'),
+        ),
+    ]
@@ -1,24 +1,51 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.validators import MinValueValidator
 from listings.models import FoodListing
 
 User = get_user_model()
 
+class ApplicationStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    APPROVED = 'APPROVED', 'Approved'
+    REJECTED = 'REJECTED', 'Rejected'
+    COLLECTED = 'COLLECTED', 'Collected'
+
+
+# A seeker holds at most one application in these statuses per listing.
+# Module level so the constraint in FoodApplication.Meta can use it.
+ACTIVE_STATUSES = (ApplicationStatus.PENDING, ApplicationStatus.APPROVED)
+
+
 class FoodApplication(models.Model):
-    class Status(models.TextChoices):
-        PENDING = 'PENDING', 'Pending'
-        APPROVED = 'APPROVED', 'Approved'
-        REJECTED = 'REJECTED', 'Rejected'
-        COLLECTED = 'COLLECTED', 'Collected'
+    Status = ApplicationStatus
+    ACTIVE_STATUSES = ACTIVE_STATUSES
 
     listing = models.ForeignKey(FoodListing, on_delete=models.CASCADE, related_name='applications')
     seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='applications')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     message = models.TextField(blank=True)
     beneficiaries_count = models.IntegerField(default=0)
+    quantity_requested = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
     preferred_pickup_time = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['listing', 'seeker'],
+                condition=models.Q(status__in=ACTIVE_STATUSES),
+                name='application_active_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='application_created_id_idx'),
+            models.Index(fields=['seeker', 'created_at', 'id'], name='application_seeker_created_idx'),
+            # Provider inboxes join through listing; (listing, status) serves both the
+            # join and the per-listing status filters.
+            models.Index(fields=['listing', 'status'], name='application_listing_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.seeker.username} - {self.listing.title}"
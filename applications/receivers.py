@@ -0,0 +1,10 @@
+from . import allocation
+
+
+def application_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        allocation.shift_counts(instance.listing_id, new_status=instance.status)
+
+
+def application_deleted(sender, instance, **kwargs):
+    allocation.shift_counts(instance.listing_id, old_status=instance.status)
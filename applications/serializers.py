@@ -1,6 +1,10 @@
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from listings.models import FoodListing
 from .models import FoodApplication
 
+User = get_user_model()
+
 class FoodApplicationSerializer(serializers.ModelSerializer):
     seeker_name = serializers.ReadOnlyField(source='seeker.username')
     listing_title = serializers.ReadOnlyField(source='listing.title')
@@ -10,6 +14,61 @@ class FoodApplicationSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('seeker', 'status', 'created_at', 'updated_at')
 
+    def validate(self, attrs):
+        listing = attrs.get('listing')
+        if self.instance is None and listing is not None:
+            if listing.status != listing.Status.AVAILABLE:
+                raise serializers.ValidationError({'listing': 'This listing is no longer available.'})
+            if attrs.get('quantity_requested', 1) > listing.quantity_available:
+                raise serializers.ValidationError(
+                    {'quantity_requested': f'Only {listing.quantity_available} left on this listing.'}
+                )
+        return attrs
+
     def create(self, validated_data):
         validated_data['seeker'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class InboxSeekerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'organization_name', 'is_verified')
+
+
+class InboxSeekerContactSerializer(InboxSeekerSerializer):
+    class Meta(InboxSeekerSerializer.Meta):
+        fields = InboxSeekerSerializer.Meta.fields + ('phone_number', 'email')
+
+
+class InboxApplicationSerializer(serializers.ModelSerializer):
+    # A provider gets a seeker's phone and email once they approve the
+    # application, not for every pending one that lands in the inbox.
+    seeker = serializers.SerializerMethodField()
+
+    class Meta:
+        model = FoodApplication
+        fields = (
+            'id', 'status', 'seeker', 'message', 'beneficiaries_count', 'quantity_requested',
+            'preferred_pickup_time', 'created_at',
+        )
+
+    def get_seeker(self, application):
+        if application.status == FoodApplication.Status.APPROVED:
+            return InboxSeekerContactSerializer(application.seeker).data
+        return InboxSeekerSerializer(application.seeker).data
+
+
+class InboxListingSerializer(serializers.ModelSerializer):
+    # Filled by the inbox's Prefetch, already filtered by status and capped per listing.
+    applications = InboxApplicationSerializer(source='inbox_applications', many=True)
+    # Where the rest of the listing's applications continue, or null when they all fit.
+    applications_next = serializers.URLField(read_only=True)
+
+    class Meta:
+        model = FoodListing
+        fields = (
+            'id', 'title', 'status', 'category', 'quantity', 'quantity_available', 'expiry_date',
+            'pending_applications', 'approved_applications', 'created_at', 'applications',
+            'applications_next',
+        )
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent on commit whenever applications move between statuses through
+# applications.allocation. Arguments: ``applications`` (the updated
+# instances), ``old_status`` and ``new_status``.
+application_status_changed = Signal()
@@ -1,3 +1,395 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from food_connect_project.testing import QueryCountGuardMixin, apply, create_listing, create_user
+from analytics.models import ProviderStats
+from listings.models import FoodListing
+from notifications.models import Notification
+
+from . import allocation
+from .models import FoodApplication
+from .signals import application_status_changed
+
+User = get_user_model()
+
+
+class ApplicationQueryCountTests(QueryCountGuardMixin, APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+
+    def add_applications(self, count):
+        for i in range(count):
+            apply(create_listing(self.provider, title=f'Listing {i}'))
+
+    def test_provider_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.provider)
+        self.add_applications(2)
+        self.assertQueryCountConstant('/api/applications/?page_size=50', self.add_applications)
+
+
+class ApplicationApprovalTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.listing = create_listing(self.provider)
+        self.client.force_authenticate(self.provider)
+
+    def apply(self, units):
+        return apply(self.listing, quantity_requested=units)
+
+    def set_status(self, application, status):
+        return self.client.post(f'/api/applications/{application.id}/update_status/', {'status': status})
+
+    def test_approvals_cannot_overallocate(self):
+        first, second, third = self.apply(3), self.apply(2), self.apply(1)
+        self.assertEqual(self.set_status(first, 'APPROVED').status_code, 200)
+        self.assertEqual(self.set_status(second, 'APPROVED').status_code, 200)
+        response = self.set_status(third, 'APPROVED')
+        self.assertEqual(response.status_code, 409)
+
+        self.listing.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 0)
+        self.assertEqual(self.listing.status, FoodListing.Status.PENDING)
+        self.assertEqual(third.status, FoodApplication.Status.PENDING)
+
+    def test_repeated_approval_is_applied_once(self):
+        application = self.apply(2)
+        self.assertEqual(self.set_status(application, 'APPROVED').status_code, 200)
+        self.assertEqual(self.set_status(application, 'APPROVED').status_code, 400)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 3)
+
+    def test_rejecting_an_approval_releases_units(self):
+        application = self.apply(5)
+        self.set_status(application, 'APPROVED')
+        self.set_status(application, 'REJECTED')
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 5)
+        self.assertEqual(self.listing.status, FoodListing.Status.AVAILABLE)
+
+    def test_listing_edits_keep_reserved_units(self):
+        self.set_status(self.apply(3), 'APPROVED')
+        response = self.client.patch(
+            f'/api/listings/{self.listing.id}/', {'title': 'Warm meals', 'quantity_available': 50}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.title, 'Warm meals')
+        self.assertEqual(self.listing.quantity_available, 2)
+        self.assertEqual(self.listing.approved_applications, 1)
+
+    def test_reserving_units_refreshes_cached_browse_pages(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/listings/').data['results'][0]['quantity_available'], 5)
+        self.client.force_authenticate(self.provider)
+        self.set_status(self.apply(2), 'APPROVED')
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/listings/').data['results'][0]['quantity_available'], 3)
+
+    def restock(self, units):
+        return self.client.post(f'/api/listings/{self.listing.id}/restock/', {'units': units}, format='json')
+
+    def test_providers_restock_and_correct_inventory(self):
+        self.set_status(self.apply(5), 'APPROVED')
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.status, FoodListing.Status.PENDING)
+
+        response = self.restock(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'quantity_available': 3})
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.status, FoodListing.Status.AVAILABLE)
+        self.assertEqual(self.listing.approved_applications, 1)
+
+        self.assertEqual(self.restock(-4).status_code, 409)
+        self.assertEqual(self.restock(-3).data, {'quantity_available': 0})
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.status, FoodListing.Status.PENDING)
+        for units in (0, 1.5, True, '2', 2 ** 40):
+            self.assertEqual(self.restock(units).status_code, 400, units)
+
+        self.client.force_authenticate(create_user())
+        self.assertIn(self.restock(1).status_code, (403, 404))
+
+    def test_last_pickup_marks_listing_collected(self):
+        application = self.apply(5)
+        self.set_status(application, 'APPROVED')
+        self.client.force_authenticate(application.seeker)
+        response = self.client.post(f'/api/applications/{application.id}/confirm_pickup/')
+        self.assertEqual(response.status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.status, FoodListing.Status.COLLECTED)
+
+
+class DuplicateApplicationTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.seeker = User.objects.create_user(
+            username='seeker', password='pass12345', role=User.Role.SEEKER
+        )
+        self.listing = create_listing(self.provider)
+
+    def apply(self):
+        self.client.force_authenticate(self.seeker)
+        return self.client.post('/api/applications/', {'listing': self.listing.id})
+
+    def counts(self):
+        self.listing.refresh_from_db()
+        return self.listing.pending_applications, self.listing.approved_applications
+
+    def test_second_active_application_conflicts(self):
+        self.assertEqual(self.apply().status_code, 201)
+        response = self.apply()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(FoodApplication.objects.filter(listing=self.listing).count(), 1)
+
+    def test_constraint_rejects_duplicates_that_skip_the_check(self):
+        FoodApplication.objects.create(listing=self.listing, seeker=self.seeker)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FoodApplication.objects.create(listing=self.listing, seeker=self.seeker)
+
+    def test_seeker_can_apply_again_after_a_rejection(self):
+        application = FoodApplication.objects.create(listing=self.listing, seeker=self.seeker)
+        allocation.transition(application, FoodApplication.Status.REJECTED)
+        self.assertEqual(self.apply().status_code, 201)
+
+    def test_listing_counters_follow_the_applications(self):
+        self.apply()
+        other = FoodApplication.objects.create(
+            listing=self.listing,
+            seeker=User.objects.create_user(username='other', password='pass12345', role=User.Role.SEEKER),
+        )
+        self.assertEqual(self.counts(), (2, 0))
+        allocation.transition(other, FoodApplication.Status.APPROVED)
+        self.assertEqual(self.counts(), (1, 1))
+        allocation.transition(other, FoodApplication.Status.COLLECTED)
+        self.assertEqual(self.counts(), (1, 0))
+        FoodApplication.objects.filter(seeker=self.seeker).delete()
+        self.assertEqual(self.counts(), (0, 0))
+
+        FoodListing.objects.filter(pk=self.listing.pk).update(pending_applications=7)
+        allocation.recount([self.listing.id])
+        self.assertEqual(self.counts(), (0, 0))
+
+    def test_provider_listing_view_reads_the_counters(self):
+        self.apply()
+        self.client.force_authenticate(self.provider)
+        response = self.client.get(f'/api/listings/{self.listing.id}/')
+        self.assertEqual(response.data['pending_applications'], 1)
+        self.assertEqual(response.data['approved_applications'], 0)
+
+    def test_counters_are_hidden_from_everyone_else(self):
+        self.apply()
+        owner_only = {'pending_applications', 'approved_applications', 'expiry_alert_at'}
+        self.client.force_authenticate(None)
+        self.assertFalse(owner_only & set(self.client.get('/api/listings/').data['results'][0]))
+        self.client.force_authenticate(self.seeker)
+        self.assertFalse(owner_only & set(self.client.get(f'/api/listings/{self.listing.id}/').data))
+        self.client.force_authenticate(User.objects.create_user(
+            username='admin', password='pass12345', role=User.Role.ADMIN
+        ))
+        self.assertLessEqual(owner_only, set(self.client.get(f'/api/listings/{self.listing.id}/').data))
+
+
+class ProviderInboxTests(QueryCountGuardMixin, APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.client.force_authenticate(self.provider)
+
+    def create_listing(self, provider=None, hours_left=24):
+        return create_listing(provider or self.provider, hours_left=hours_left, units=10)
+
+    def add_listings(self, count):
+        for _ in range(count):
+            listing = self.create_listing()
+            apply(listing)
+            apply(listing)
+
+    def get_inbox(self, **params):
+        response = self.client.get('/api/applications/inbox/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_groups_applications_under_listings_soonest_expiry_first(self):
+        later = self.create_listing(hours_left=30)
+        sooner = self.create_listing(hours_left=3)
+        self.create_listing(hours_left=1)
+        self.create_listing(provider=User.objects.create_user(
+            username='rival', password='pass12345', role=User.Role.PROVIDER
+        ))
+        first = apply(later)
+        apply(sooner)
+        apply(later)
+
+        rows = self.get_inbox().data['results']
+        self.assertEqual([row['id'] for row in rows], [sooner.id, later.id])
+        self.assertEqual(len(rows[1]['applications']), 2)
+        self.assertEqual(rows[1]['pending_applications'], 2)
+        self.assertEqual(rows[1]['applications'][0]['seeker']['username'], first.seeker.username)
+
+    def test_status_filter_and_per_listing_cap(self):
+        listing = self.create_listing()
+        for _ in range(3):
+            apply(listing)
+        approved = apply(listing, status=FoodApplication.Status.APPROVED)
+        apply(self.create_listing())
+
+        rows = self.get_inbox(status='approved').data['results']
+        self.assertEqual([row['id'] for row in rows], [listing.id])
+        self.assertEqual([app['id'] for app in rows[0]['applications']], [approved.id])
+
+        rows = self.get_inbox(applications_limit=2).data['results']
+        self.assertEqual([len(row['applications']) for row in rows], [2, 1])
+        self.assertEqual(self.client.get('/api/applications/inbox/?status=LOST').status_code, 400)
+
+    def test_applications_next_picks_up_where_the_listing_was_cut_off(self):
+        busy = self.create_listing()
+        quiet = self.create_listing()
+        expected = [apply(busy).id for _ in range(5)]
+        apply(busy, status=FoodApplication.Status.REJECTED)
+        apply(quiet)
+
+        rows = {row['id']: row for row in self.get_inbox(status='pending', applications_limit=2).data['results']}
+        self.assertIsNone(rows[quiet.id]['applications_next'])
+        seen = [app['id'] for app in rows[busy.id]['applications']]
+        url = rows[busy.id]['applications_next']
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            seen += [app['id'] for app in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/applications/?listing=abc').status_code, 400)
+
+    def test_seeker_contact_details_only_once_approved(self):
+        listing = self.create_listing()
+        pending = apply(listing)
+        approved = apply(listing, status=FoodApplication.Status.APPROVED)
+
+        seekers = {app['id']: app['seeker'] for app in self.get_inbox().data['results'][0]['applications']}
+        self.assertNotIn('phone_number', seekers[pending.id])
+        self.assertNotIn('email', seekers[pending.id])
+        self.assertEqual(seekers[approved.id]['email'], approved.seeker.email)
+        self.assertIn('phone_number', seekers[approved.id])
+
+    def test_query_count_does_not_grow_with_listings_or_applications(self):
+        self.add_listings(2)
+        self.assertQueryCountConstant('/api/applications/inbox/?page_size=50', self.add_listings)
+
+    def test_only_providers(self):
+        self.client.force_authenticate(User.objects.create_user(
+            username='seeker', password='pass12345', role=User.Role.SEEKER
+        ))
+        self.assertEqual(self.client.get('/api/applications/inbox/').status_code, 403)
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False, 'BATCH_SIZE': 100}, MATCHING={'ASYNC': False})
+class BulkStatusTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.listing = self.create_listing(units=10)
+        self.client.force_authenticate(self.provider)
+
+    def create_listing(self, units, provider=None):
+        return create_listing(provider or self.provider, units=units)
+
+    def apply(self, listing=None, units=1):
+        return apply(listing or self.listing, quantity_requested=units)
+
+    def bulk(self, applications, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/applications/bulk_update_status/', {
+                'ids': [application.id for application in applications], 'status': status,
+            }, format='json')
+
+    def statuses(self, applications):
+        return [FoodApplication.objects.get(pk=application.pk).status for application in applications]
+
+    def test_bulk_approval_reserves_and_notifies_per_listing(self):
+        applications = [self.apply(units=2) for _ in range(5)]
+        received = []
+
+        def receiver(applications, old_status, **kwargs):
+            received.append((old_status, len(applications)))
+
+        application_status_changed.connect(receiver)
+        self.addCleanup(application_status_changed.disconnect, receiver)
+
+        response = self.bulk(applications, 'APPROVED')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.statuses(applications), ['APPROVED'] * 5)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 0)
+        self.assertEqual(self.listing.status, FoodListing.Status.PENDING)
+        self.assertEqual((self.listing.pending_applications, self.listing.approved_applications), (0, 5))
+        self.assertEqual(received, [('PENDING', 5)])
+        self.assertEqual(Notification.objects.filter(message__contains='was approved').count(), 5)
+        self.assertEqual(ProviderStats.objects.get(provider=self.provider).applications_approved, 5)
+
+    def test_bulk_reject_releases_only_approved_units(self):
+        approved, pending = self.apply(units=4), self.apply(units=3)
+        allocation.transition(approved, FoodApplication.Status.APPROVED)
+        response = self.bulk([approved, pending], 'REJECTED')
+        self.assertEqual(response.status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 10)
+        self.assertEqual((self.listing.pending_applications, self.listing.approved_applications), (0, 0))
+
+    def test_nothing_changes_when_any_application_fails(self):
+        applications = [self.apply(units=4) for _ in range(3)]
+        response = self.bulk(applications, 'APPROVED')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.statuses(applications), ['PENDING'] * 3)
+
+        allocation.transition(applications[0], FoodApplication.Status.APPROVED)
+        self.assertEqual(self.bulk(applications, 'APPROVED').status_code, 400)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quantity_available, 6)
+
+    def test_ownership_is_checked(self):
+        rival = User.objects.create_user(username='rival', password='pass12345', role=User.Role.PROVIDER)
+        theirs = self.apply(listing=self.create_listing(units=5, provider=rival))
+        mine = self.apply()
+        response = self.bulk([mine, theirs], 'APPROVED')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.statuses([mine, theirs]), ['PENDING', 'PENDING'])
+
+        self.client.force_authenticate(mine.seeker)
+        self.assertEqual(self.bulk([mine], 'APPROVED').status_code, 403)
+
+    def test_ids_must_be_real_integers(self):
+        application = self.apply()
+        for ids in ([True], [float(application.id)], [application.id + 0.9], [10 ** 30], ['1e3'], [None], [0]):
+            response = self.client.post(
+                '/api/applications/bulk_update_status/', {'ids': ids, 'status': 'APPROVED'}, format='json'
+            )
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertEqual(self.statuses([application]), ['PENDING'])
+
+        response = self.client.post('/api/applications/bulk_update_status/', {
+            'ids': [application.id, str(application.id), application.id], 'status': 'APPROVED',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['ids'], [application.id])
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def approve(count):
+            applications = [self.apply() for _ in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(self.bulk(applications, 'APPROVED').status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(approve(2), approve(6))
@@ -1,12 +1,27 @@
+from urllib.parse import urlencode
+
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.response import Response
+from . import allocation
 from .models import FoodApplication
-from .serializers import FoodApplicationSerializer
+from .serializers import FoodApplicationSerializer, InboxListingSerializer
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.urls import reverse
+from listings.models import FoodListing
 
 User = get_user_model()
 
+
+class DuplicateApplication(APIException):
+    status_code = 409
+    default_detail = 'You already have an active application for this listing.'
+    default_code = 'duplicate_application'
+
+
 class IsSeekerOrProviderOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated
@@ -14,54 +29,199 @@ class IsSeekerOrProviderOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.role == User.Role.ADMIN or request.user.is_staff:
             return True
-        if request.user == obj.seeker:
+        if request.user.id == obj.seeker_id:
             return True
-        if request.user == obj.listing.provider:
+        if request.user.id == obj.listing.provider_id:
             return True
         return False
 
+MAX_BULK_APPLICATIONS = 500
+DEFAULT_INBOX_APPLICATIONS = 20
+MAX_INBOX_APPLICATIONS = 100
+# Largest id a BigAutoField can hold.
+MAX_ID = 2 ** 63 - 1
+
+
+def parse_application_id(value):
+    """An application id from JSON: an int or a string of digits. Bools, floats and anything out of range aren't."""
+    if type(value) is str and value.isascii() and value.isdigit():
+        value = int(value)
+    if type(value) is not int or not 0 < value <= MAX_ID:
+        raise ValidationError({'ids': 'Application ids must be positive integers.'})
+    return value
+
+
+def parse_listing_id(value):
+    """``?listing=<id>`` as an int."""
+    if not (value.isascii() and value.isdigit()) or not 0 < int(value) <= MAX_ID:
+        raise ValidationError({'listing': 'Must be a listing id.'})
+    return int(value)
+
+
+def parse_statuses(value):
+    """``?status=PENDING,APPROVED`` as a list of statuses; empty means all of them."""
+    statuses = [part.strip().upper() for part in (value or '').split(',') if part.strip()]
+    invalid = set(statuses) - set(FoodApplication.Status.values)
+    if invalid:
+        raise ValidationError({'status': f'Unknown status: {", ".join(sorted(invalid))}.'})
+    return statuses
+
+
 class FoodApplicationViewSet(viewsets.ModelViewSet):
     queryset = FoodApplication.objects.all()
     serializer_class = FoodApplicationSerializer
     permission_classes = (IsSeekerOrProviderOrAdmin,)
 
+    def get_pagination_ordering(self):
+        if self.action == 'inbox':
+            # Soonest-expiring listings first: that's the order a provider has to triage in.
+            return ('expiry_date', 'id')
+        if self.action == 'list' and 'listing' in self.request.query_params:
+            # One listing's applications run oldest first, picking up where the inbox left off.
+            return ('created_at', 'id')
+        return ('-created_at', '-id')
+
     def get_queryset(self):
         user = self.request.user
-        if user.role == User.Role.ADMIN or user.is_staff:
-            return FoodApplication.objects.all()
-        if user.role == User.Role.PROVIDER:
-            return FoodApplication.objects.filter(listing__provider=user)
-        return FoodApplication.objects.filter(seeker=user)
+        # seeker_name, listing_title and the object permission check all read
+        # joined rows, so a page costs one query regardless of its size.
+        applications = FoodApplication.objects.select_related('seeker', 'listing')
+        if user.role != User.Role.ADMIN and not user.is_staff:
+            if user.role == User.Role.PROVIDER:
+                applications = applications.filter(listing__provider=user)
+            else:
+                applications = applications.filter(seeker=user)
+        if self.action == 'list':
+            applications = self.filter_list(applications)
+        return applications
+
+    def filter_list(self, applications):
+        params = self.request.query_params
+        if 'listing' in params:
+            applications = applications.filter(listing_id=parse_listing_id(params['listing']))
+        statuses = parse_statuses(params.get('status'))
+        if statuses:
+            applications = applications.filter(status__in=statuses)
+        return applications
 
     def perform_create(self, serializer):
         if self.request.user.role != User.Role.SEEKER and not self.request.user.is_staff:
              raise permissions.PermissionDenied("Only Seekers can apply for food.")
-        serializer.save(seeker=self.request.user)
+        # An index-only probe of the partial unique constraint turns most
+        # duplicates away before the insert; the constraint catches the races.
+        if FoodApplication.objects.filter(
+            listing=serializer.validated_data['listing'],
+            seeker=self.request.user,
+            status__in=FoodApplication.ACTIVE_STATUSES,
+        ).exists():
+            raise DuplicateApplication()
+        try:
+            with transaction.atomic():
+                serializer.save(seeker=self.request.user)
+        except IntegrityError:
+            raise DuplicateApplication()
 
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         application = self.get_object()
         # Only provider can approve/reject
-        if request.user != application.listing.provider and request.user.role != User.Role.ADMIN:
+        if request.user.id != application.listing.provider_id and request.user.role != User.Role.ADMIN:
             return Response({'error': 'Not authorized'}, status=403)
         
         status = request.data.get('status')
-        if status in [FoodApplication.Status.APPROVED, FoodApplication.Status.REJECTED, FoodApplication.Status.COLLECTED]:
-            application.status = status
-            application.save()
-            return Response({'status': f'Application {status}'})
-        return Response({'error': 'Invalid status'}, status=400)
+        try:
+            allocation.transition(application, status)
+        except allocation.TransitionError as exc:
+            return Response({'error': str(exc)}, status=exc.status_code)
+        return Response({'status': f'Application {status}'})
+
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        user = request.user
+        is_admin = user.role == User.Role.ADMIN or user.is_staff
+        if user.role != User.Role.PROVIDER and not is_admin:
+            return Response({'error': 'Not authorized'}, status=403)
+
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Expected a non-empty list of application ids.'})
+        ids = list(dict.fromkeys(parse_application_id(application_id) for application_id in ids))
+        if len(ids) > MAX_BULK_APPLICATIONS:
+            raise ValidationError({'ids': f'At most {MAX_BULK_APPLICATIONS} applications per request.'})
+
+        status = request.data.get('status')
+        try:
+            # Ownership is part of the query that locks the applications.
+            applications = allocation.bulk_transition(ids, status, provider=None if is_admin else user)
+        except allocation.TransitionError as exc:
+            return Response({'error': str(exc)}, status=exc.status_code)
+        return Response({'status': f'{len(applications)} applications {status}', 'ids': sorted(ids)})
 
     @action(detail=True, methods=['post'])
     def confirm_pickup(self, request, pk=None):
         application = self.get_object()
-        if request.user != application.seeker:
+        if request.user.id != application.seeker_id:
              return Response({'error': 'Not authorized'}, status=403)
         
-        if application.status == FoodApplication.Status.APPROVED:
-            application.status = FoodApplication.Status.COLLECTED
-            application.save()
-            # Update listing status as well? Maybe not if quantity remains.
-            # For simplicity, let's assume 1 application = 1 listing fully collected for now, or handle partials later.
-            return Response({'status': 'Pickup confirmed'})
-        return Response({'error': 'Application must be APPROVED to confirm pickup'}, status=400)
+        if application.status != FoodApplication.Status.APPROVED:
+            return Response({'error': 'Application must be APPROVED to confirm pickup'}, status=400)
+        try:
+            # The listing becomes COLLECTED once its units are gone and every approved pickup is done.
+            allocation.transition(application, FoodApplication.Status.COLLECTED)
+        except allocation.TransitionError as exc:
+            return Response({'error': str(exc)}, status=exc.status_code)
+        return Response({'status': 'Pickup confirmed'})
+
+    def get_inbox_options(self):
+        statuses = parse_statuses(self.request.query_params.get('status'))
+        try:
+            limit = min(
+                max(int(self.request.query_params.get('applications_limit', DEFAULT_INBOX_APPLICATIONS)), 1),
+                MAX_INBOX_APPLICATIONS,
+            )
+        except ValueError:
+            raise ValidationError({'applications_limit': 'Must be an integer.'})
+        return statuses, limit
+
+    def get_inbox_queryset(self, statuses, limit):
+        applications = FoodApplication.objects.all()
+        if statuses:
+            applications = applications.filter(status__in=statuses)
+        # One query for the page of listings and one for their applications
+        # with seekers joined; the slice becomes a per-listing window, so a
+        # busy listing can't blow up the page. The one row past the limit
+        # only says whether there is more.
+        return (
+            FoodListing.objects
+            .filter(provider=self.request.user)
+            .filter(Exists(applications.filter(listing=OuterRef('pk'))))
+            .prefetch_related(Prefetch(
+                'applications',
+                queryset=applications.select_related('seeker').order_by('created_at', 'id')[:limit + 1],
+                to_attr='inbox_applications',
+            ))
+        )
+
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        if request.user.role != User.Role.PROVIDER:
+            return Response({'error': 'Only Providers have an application inbox'}, status=403)
+        statuses, limit = self.get_inbox_options()
+        page = self.paginate_queryset(self.get_inbox_queryset(statuses, limit))
+        for listing in page:
+            has_more = len(listing.inbox_applications) > limit
+            listing.inbox_applications = listing.inbox_applications[:limit]
+            listing.applications_next = (
+                self.get_applications_next(listing, statuses, limit) if has_more else None
+            )
+        return self.get_paginated_response(InboxListingSerializer(page, many=True).data)
+
+    def get_applications_next(self, listing, statuses, limit):
+        """The applications list for ``listing``, from just after the last one the inbox showed."""
+        last = listing.inbox_applications[-1]
+        params = {'listing': listing.id}
+        if statuses:
+            params['status'] = ','.join(statuses)
+        params['page_size'] = limit
+        params['cursor'] = self.paginator.encode_position([last.created_at.isoformat(), last.id])
+        return self.request.build_absolute_uri(f"{reverse('foodapplication-list')}?{urlencode(params)}")
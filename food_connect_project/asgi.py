@@ -2,6 +2,8 @@
 ASGI config for food_connect_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests for the notification event stream are answered by a long-lived
+async handler; everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'food_connect_project.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from notifications.streaming import STREAM_PATH, notification_stream  # noqa: E402  (needs apps loaded)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await notification_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
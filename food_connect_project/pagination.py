@@ -0,0 +1,193 @@
+import base64
+import json
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def get_pagination_setting(name):
+    defaults = {
+        'MAX_PAGE_SIZE': 100,
+        'INCLUDE_COUNT': False,
+    }
+    return getattr(settings, 'KEYSET_PAGINATION', {}).get(name, defaults[name])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a composite ordering such as
+    ``(-created_at, -id)``.
+
+    The cursor holds the ordering values of the last row on the page, and the
+    next page is fetched with a lexicographic ``WHERE (created_at, id) < (...)``
+    predicate, so every page costs the same index range scan no matter how deep
+    the client has paged. No ``COUNT(*)`` is issued unless ``INCLUDE_COUNT``
+    is enabled in ``KEYSET_PAGINATION``.
+
+    Views pick their ordering through a ``pagination_ordering`` attribute, or a
+    ``get_pagination_ordering()`` method when it depends on the request. The
+    last field must be unique (normally ``id``).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.include_count = get_pagination_setting('INCLUDE_COUNT')
+        self.count = queryset.count() if self.include_count else None
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        self.has_next = len(results) > self.page_size
+        return self.page
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or get_pagination_setting('MAX_PAGE_SIZE')
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        if requested <= 0:
+            return page_size
+        return min(requested, get_pagination_setting('MAX_PAGE_SIZE'))
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_pagination_ordering'):
+            return tuple(view.get_pagination_ordering())
+        return tuple(getattr(view, 'pagination_ordering', self.ordering))
+
+    def get_seek_filter(self, position):
+        """
+        Build ``(a, b, c) > (x, y, z)`` as
+        ``a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)``,
+        honouring the direction of each ordering field.
+        """
+        clauses = []
+        for index, order in enumerate(self.ordering):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            equal = {
+                prior.lstrip('-'): position[prior_index]
+                for prior_index, prior in enumerate(self.ordering[:index])
+            }
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': position[index]}))
+        return reduce(or_, clauses)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            querystring = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            position = json.loads(querystring)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # A well-formed cursor can still carry values the columns can't hold;
+        # catch those here rather than as a 500 from the seek filter.
+        try:
+            position = [
+                self.get_ordering_field(queryset, order.lstrip('-')).to_python(value)
+                for order, value in zip(self.ordering, position)
+            ]
+        except (DjangoValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_ordering_field(self, queryset, name):
+        """The model field, or the annotation's output field, behind ordering ``name``."""
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_position(self, position):
+        """The cursor value for ``position``; views use it to link into another list."""
+        querystring = json.dumps(position, separators=(',', ':'))
+        return base64.urlsafe_b64encode(querystring.encode('ascii')).decode('ascii')
+
+    def encode_cursor(self, position):
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.encode_position(position)
+        )
+
+    def get_position_from_instance(self, instance):
+        position = []
+        for order in self.ordering:
+            value = getattr(instance, order.lstrip('-'))
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float, str)):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.get_position_from_instance(self.page[-1]))
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        if self.cursor_query_param not in parse.parse_qs(parse.urlsplit(url).query):
+            return None
+        return remove_query_param(url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.include_count:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['first'] = self.get_first_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'first': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'results': schema,
+        }
+        if get_pagination_setting('INCLUDE_COUNT'):
+            properties['count'] = {'type': 'integer'}
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
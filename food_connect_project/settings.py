@@ -50,6 +50,8 @@ INSTALLED_APPS = [
     'payments',
     'notifications',
     'support',
+    'analytics',
+    'matching',
 ]
 
 MIDDLEWARE = [
@@ -93,6 +95,91 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set REDIS_URL to share the cache between workers or
+# CACHE_DIR for a file based cache.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+LISTING_CACHE = {
+    'ALIAS': 'default',
+    # Seconds a cached browse page may be served; writes invalidate it sooner.
+    'TIMEOUT': int(os.getenv('LISTING_CACHE_TIMEOUT', '60')),
+}
+
+
+NOTIFICATIONS = {
+    # Write notifications from a background thread instead of the request.
+    'ASYNC': os.getenv('NOTIFICATIONS_ASYNC', 'True') == 'True',
+    'BATCH_SIZE': int(os.getenv('NOTIFICATIONS_BATCH_SIZE', '1000')),
+    # Pub/sub feeding the /api/notifications/stream/ SSE endpoint.
+    'BROKER': os.getenv('NOTIFICATIONS_BROKER', 'notifications.broker.InMemoryBroker'),
+}
+
+
+MATCHING = {
+    # Recommendations kept per seeker.
+    'FEED_SIZE': int(os.getenv('MATCHING_FEED_SIZE', '50')),
+    # Update feeds from a background worker instead of the request that changed them.
+    'ASYNC': os.getenv('MATCHING_ASYNC', 'True') == 'True',
+    'MAX_DISTANCE_KM': float(os.getenv('MATCHING_MAX_DISTANCE_KM', '25')),
+    # Urgency starts counting this many hours before expiry.
+    'URGENCY_HORIZON_HOURS': int(os.getenv('MATCHING_URGENCY_HORIZON_HOURS', '48')),
+    'WEIGHTS': {'proximity': 0.4, 'affinity': 0.25, 'urgency': 0.25, 'fit': 0.1},
+    # `manage.py push_expiring` alerts nearby seekers this many hours before a listing expires.
+    'ALERT_WINDOW_HOURS': int(os.getenv('MATCHING_ALERT_WINDOW_HOURS', '6')),
+}
+
+
+PAYMENT_WEBHOOKS = {
+    # Apply webhook events from a background worker pool instead of the request.
+    'ASYNC': os.getenv('PAYMENT_WEBHOOKS_ASYNC', 'True') == 'True',
+    'WORKERS': int(os.getenv('PAYMENT_WEBHOOKS_WORKERS', '4')),
+    # Failed events are retried with exponential backoff, then marked FAILED.
+    'MAX_ATTEMPTS': int(os.getenv('PAYMENT_WEBHOOKS_MAX_ATTEMPTS', '6')),
+    'BACKOFF_SECONDS': int(os.getenv('PAYMENT_WEBHOOKS_BACKOFF_SECONDS', '5')),
+    'POLL_SECONDS': int(os.getenv('PAYMENT_WEBHOOKS_POLL_SECONDS', '5')),
+}
+
+PAYMENT_RECONCILIATION = {
+    # Client asked for the status of transactions whose webhook never came.
+    'GATEWAY': os.getenv('PAYMENT_GATEWAY', 'payments.gateway.MockGateway'),
+    'STALE_AFTER_SECONDS': int(os.getenv('PAYMENT_RECONCILE_STALE_AFTER_SECONDS', '900')),
+    'BATCH_SIZE': int(os.getenv('PAYMENT_RECONCILE_BATCH_SIZE', '200')),
+    # Concurrent gateway lookups and settlements.
+    'WORKERS': int(os.getenv('PAYMENT_RECONCILE_WORKERS', '8')),
+}
+
+ENTITLEMENTS = {
+    'ALIAS': 'default',
+    # Seconds a user's plan features stay in the shared cache.
+    'TIMEOUT': int(os.getenv('ENTITLEMENTS_TIMEOUT', '300')),
+    # Per-process LRU in front of it; also bounds staleness in other processes.
+    'LOCAL_TIMEOUT': int(os.getenv('ENTITLEMENTS_LOCAL_TIMEOUT', '30')),
+    'LOCAL_MAX_SIZE': int(os.getenv('ENTITLEMENTS_LOCAL_MAX_SIZE', '10000')),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -140,6 +227,15 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'food_connect_project.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('PAGE_SIZE', '20')),
+}
+
+KEYSET_PAGINATION = {
+    # Upper bound for the client supplied ``page_size`` query parameter.
+    'MAX_PAGE_SIZE': int(os.getenv('MAX_PAGE_SIZE', '100')),
+    # COUNT(*) is skipped by default; it gets expensive on large tables.
+    'INCLUDE_COUNT': os.getenv('PAGINATION_INCLUDE_COUNT', 'False') == 'True',
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,71 @@
+import itertools
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from applications.models import FoodApplication
+from listings.models import FoodListing
+
+User = get_user_model()
+
+_usernames = itertools.count(1)
+
+
+def create_user(role=User.Role.SEEKER, **fields):
+    """A user with a username no other factory-made user in the run shares."""
+    fields.setdefault('username', f'{role.lower()}-{next(_usernames)}')
+    fields.setdefault('password', 'pass12345')
+    return User.objects.create_user(role=role, **fields)
+
+
+def create_listing(provider, hours_left=24, units=5, **fields):
+    """An AVAILABLE listing saved straight to the database, so no listing signals are sent."""
+    defaults = {
+        'title': 'Meals',
+        'description': 'Hot meals',
+        'quantity': f'{units} plates',
+        'quantity_available': units,
+        'expiry_date': timezone.now() + timedelta(hours=hours_left),
+    }
+    return FoodListing.objects.create(provider=provider, **{**defaults, **fields})
+
+
+def apply(listing, seeker=None, **fields):
+    """An application for ``listing``, from a new seeker unless one is given."""
+    return FoodApplication.objects.create(listing=listing, seeker=seeker or create_user(), **fields)
+
+
+class QueryCountGuardMixin:
+    """
+    Test mixin that fails when the number of queries behind a list endpoint
+    grows with the number of rows it returns (the classic N+1).
+    """
+
+    def assertQueryCountConstant(self, url, add_rows, extra_rows=5):
+        """
+        Request ``url``, call ``add_rows(extra_rows)`` to create more rows, then
+        request it again and require both responses to cost the same queries.
+        """
+        baseline = self._count_list_queries(url)
+        add_rows(extra_rows)
+        grown = self._count_list_queries(url)
+        self.assertEqual(
+            baseline.rows + extra_rows, grown.rows,
+            f'{url} did not return the {extra_rows} rows added by the test.',
+        )
+        self.assertEqual(
+            len(baseline.captured_queries), len(grown.captured_queries),
+            f'{url} issued {len(baseline.captured_queries)} queries for {baseline.rows} rows '
+            f'but {len(grown.captured_queries)} for {grown.rows} rows:\n'
+            + '\n'.join(query['sql'] for query in grown.captured_queries),
+        )
+
+    def _count_list_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        context.rows = len(response.data['results'])
+        return context
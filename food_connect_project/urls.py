@@ -25,4 +25,5 @@ urlpatterns = [
     path('api/payments/', include('payments.urls')),
     path('api/notifications/', include('notifications.urls')),
     path('api/support/', include('support.urls')),
+    path('api/analytics/', include('analytics.urls')),
 ]
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ListingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'listings'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from . import cache, search
+        from .models import FoodListing
+        from .signals import listings_status_changed
+
+        post_save.connect(cache.invalidate, sender=FoodListing, dispatch_uid='listings_cache_post_save')
+        post_delete.connect(cache.invalidate, sender=FoodListing, dispatch_uid='listings_cache_post_delete')
+        listings_status_changed.connect(cache.invalidate, dispatch_uid='listings_cache_status_changed')
+        post_migrate.connect(search.ensure_installed, sender=self, dispatch_uid='listings_search_post_migrate')
@@ -0,0 +1,100 @@
+"""
+Read-through cache for the public listing browse endpoint.
+
+Every anonymous/seeker caller with the same query parameters gets the same
+page, so the rendered page data is cached under a key derived from the
+normalized parameters plus a global version number. Any write to listings
+bumps the version instead of hunting down individual keys; stale entries
+simply stop being addressed and age out.
+"""
+import hashlib
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+VERSION_KEY = 'listings:browse:version'
+# Parameters that change the browse response; anything else is ignored so
+# cache-busting junk parameters can't fill the cache.
+KEY_PARAMS = ('category', 'pickup_location', 'q', 'near', 'radius_km', 'cursor', 'page_size')
+CASE_INSENSITIVE_PARAMS = ('pickup_location', 'q')
+
+
+def get_cache_setting(name):
+    defaults = {
+        'ALIAS': 'default',
+        'TIMEOUT': 60,
+    }
+    return getattr(settings, 'LISTING_CACHE', {}).get(name, defaults[name])
+
+
+def get_cache():
+    return caches[get_cache_setting('ALIAS')]
+
+
+def get_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old version.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def bump_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate(**kwargs):
+    """
+    Drop every cached browse page. Bump now so this process stops serving the
+    old pages immediately, and again on commit so a page cached by a
+    concurrent reader before the write became visible is discarded too.
+    """
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def normalize_params(query_params):
+    normalized = []
+    for name in KEY_PARAMS:
+        value = query_params.get(name)
+        if value is None or not value.strip():
+            continue
+        value = ' '.join(value.split())
+        if name in CASE_INSENSITIVE_PARAMS:
+            value = value.lower()
+        normalized.append((name, value))
+    return urlencode(normalized)
+
+
+def browse_key(request):
+    # Pagination links are absolute, so the host is part of the key.
+    raw = f'{request.get_host()}?{normalize_params(request.query_params)}'
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'listings:browse:{get_version()}:{digest}'
+
+
+def get_entry(key):
+    return get_cache().get(key)
+
+
+def set_entry(key, data):
+    body = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    entry = {'data': data, 'etag': f'"{hashlib.md5(body).hexdigest()}"'}
+    get_cache().set(key, entry, get_cache_setting('TIMEOUT'))
+    return entry
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    candidates = {candidate.strip() for candidate in header.split(',')}
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
@@ -0,0 +1,56 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import FoodListing
+from .signals import listings_status_changed
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def expire_listings(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Flip AVAILABLE listings past their expiry_date to EXPIRED.
+
+    Each batch locks at most ``batch_size`` rows off the (status, expiry_date)
+    index, skipping rows another transaction holds, and expires them with a
+    single conditional UPDATE, so locks stay short and a large backlog never
+    turns into one giant transaction. Only the listings this call actually
+    expired are announced. Returns the number of listings expired.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                FoodListing.objects
+                .filter(status=FoodListing.Status.AVAILABLE, expiry_date__lte=now)
+                .order_by('expiry_date')
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'provider_id')[:batch_size]
+            )
+            if not rows:
+                return expired
+            listing_ids = [listing_id for listing_id, _ in rows]
+            updated = FoodListing.objects.filter(
+                id__in=listing_ids, status=FoodListing.Status.AVAILABLE
+            ).update(status=FoodListing.Status.EXPIRED, updated_at=now)
+            if updated != len(rows):
+                # Backends without row locks can lose a row to a concurrent
+                # transition; announce only what this UPDATE changed.
+                changed = set(FoodListing.objects.filter(
+                    id__in=listing_ids, status=FoodListing.Status.EXPIRED, updated_at=now
+                ).values_list('id', flat=True))
+                rows = [row for row in rows if row[0] in changed]
+            if rows:
+                transaction.on_commit(lambda rows=rows: listings_status_changed.send(
+                    sender=FoodListing,
+                    listing_ids=[listing_id for listing_id, _ in rows],
+                    old_status=FoodListing.Status.AVAILABLE,
+                    new_status=FoodListing.Status.EXPIRED,
+                    provider_counts=dict(Counter(provider_id for _, provider_id in rows)),
+                ))
+        expired += updated
+        if len(listing_ids) < batch_size:
+            return expired
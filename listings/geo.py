@@ -0,0 +1,87 @@
+"""
+Geohash helpers used to bucket listings into grid cells.
+
+A geohash turns a coordinate into a base32 string where a shared prefix means
+a shared grid cell, so "everything near this point" becomes a handful of
+indexed range scans on a plain CharField instead of a full table scan. That
+works the same on SQLite and Postgres without PostGIS.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9  # ~5m x 5m cells, stored on FoodListing.geohash
+EARTH_KM_PER_DEGREE = 111.195
+# Sorts after every BASE32 character, so [cell, cell + RANGE_END) covers the cell.
+RANGE_END = '~'
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lon_range[0] = mid
+            else:
+                value <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of a cell."""
+    lat_bits = (5 * precision) // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def longitude_scale(latitude):
+    """Kilometres per degree of longitude relative to a degree of latitude."""
+    return max(math.cos(math.radians(latitude)), 0.01)
+
+
+def precision_for_radius(latitude, radius_km):
+    """
+    Pick the finest precision whose cells are still at least ``radius_km``
+    across, so the 3x3 block around the centre cell covers the whole circle.
+    """
+    for precision in range(PRECISION, 0, -1):
+        lat_size, lon_size = cell_size(precision)
+        height_km = lat_size * EARTH_KM_PER_DEGREE
+        width_km = lon_size * EARTH_KM_PER_DEGREE * longitude_scale(latitude)
+        if height_km >= radius_km and width_km >= radius_km:
+            return precision
+    return 1
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Return the geohash prefixes of the centre cell and its neighbours."""
+    precision = precision_for_radius(latitude, radius_km)
+    lat_size, lon_size = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lon_step in (-1, 0, 1):
+            lat = min(max(latitude + lat_step * lat_size, -90.0), 90.0)
+            lon = (longitude + lon_step * lon_size + 180.0) % 360.0 - 180.0
+            cells.add(encode(lat, lon, precision))
+    return sorted(cells)
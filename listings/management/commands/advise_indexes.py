@@ -0,0 +1,170 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from applications.models import FoodApplication
+from applications.views import FoodApplicationViewSet
+from food_connect_project.pagination import KeysetPagination
+from listings.models import FoodListing
+from listings.views import FoodListingViewSet
+from matching.models import FeedEntry
+from notifications.models import Notification
+from notifications.views import NotificationViewSet
+from payments.models import PaymentTransaction
+from payments.views import PaymentViewSet
+from support.models import SupportTicket
+from support.views import SupportTicketViewSet
+from users.views import AdminUserViewSet
+
+User = get_user_model()
+
+# (label, viewset, role, query params, action). Actions other than ``list``
+# are explained through the viewset's ``get_<action>_queryset()``.
+CASES = [
+    ('listings: browse', FoodListingViewSet, None, {}, 'list'),
+    ('listings: browse by category', FoodListingViewSet, None, {'category': FoodListing.Category.COOKED}, 'list'),
+    ('listings: browse near', FoodListingViewSet, None, {'near': '4.05,9.76', 'radius_km': '5'}, 'list'),
+    ('listings: browse search', FoodListingViewSet, None, {'q': 'rice'}, 'list'),
+    ('listings: expiring soon', FoodListingViewSet, None, {}, 'expiring_soon'),
+    ('listings: recommended', FoodListingViewSet, User.Role.SEEKER, {}, 'recommended'),
+    ('listings: provider', FoodListingViewSet, User.Role.PROVIDER, {}, 'list'),
+    ('listings: admin', FoodListingViewSet, User.Role.ADMIN, {}, 'list'),
+    ('applications: provider', FoodApplicationViewSet, User.Role.PROVIDER, {}, 'list'),
+    ('applications: provider inbox', FoodApplicationViewSet, User.Role.PROVIDER, {}, 'inbox'),
+    ('applications: seeker', FoodApplicationViewSet, User.Role.SEEKER, {}, 'list'),
+    ('applications: admin', FoodApplicationViewSet, User.Role.ADMIN, {}, 'list'),
+    ('notifications: user', NotificationViewSet, User.Role.SEEKER, {}, 'list'),
+    ('support: user', SupportTicketViewSet, User.Role.SEEKER, {}, 'list'),
+    ('support: admin', SupportTicketViewSet, User.Role.ADMIN, {}, 'list'),
+    ('users: admin', AdminUserViewSet, User.Role.ADMIN, {}, 'list'),
+    ('payments: history', PaymentViewSet, User.Role.SEEKER, {}, 'history'),
+]
+
+# SQLite reports "SCAN <table>" for a full scan and "SCAN <table> USING INDEX"
+# when it walks an index in order; Postgres reports "Seq Scan on <table>".
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX)(?! VIRTUAL TABLE)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway dataset, runs EXPLAIN on every list endpoint's queryset "
+        "and flags full table scans. All seeded rows are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows to seed per table.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan.')
+        parser.add_argument('--fail-on-scan', action='store_true', help='Exit with an error if a scan is found.')
+
+    def handle(self, *args, **options):
+        findings = []
+        with transaction.atomic():
+            users = self.seed(options['rows'])
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            for label, viewset, role, params, action in CASES:
+                queryset = self.get_list_queryset(viewset, users.get(role), params, action)
+                plan = queryset.explain()
+                scans = self.find_full_scans(plan)
+                if scans:
+                    findings.append(label)
+                    self.stdout.write(self.style.WARNING(f'SCAN  {label}: {", ".join(scans)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok    {label}'))
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(f'      {str(queryset.query)}')
+                    for line in plan.splitlines():
+                        self.stdout.write(f'      {line}')
+            transaction.set_rollback(True)
+
+        if findings and options['fail_on_scan']:
+            raise CommandError(f'{len(findings)} list queries fall back to full table scans.')
+
+    def get_list_queryset(self, viewset, user, params, action='list'):
+        """Build the exact queryset (with pagination ordering and LIMIT) a list request runs."""
+        request = APIRequestFactory().get('/', params)
+        if user is not None:
+            force_authenticate(request, user=user)
+        view = viewset()
+        view.action_map = {'get': action}
+        view.action = action
+        view.format_kwarg = None
+        view.args = ()
+        view.kwargs = {}
+        view.request = view.initialize_request(request)
+        view.request.user  # run authentication
+        if action == 'list':
+            queryset = view.get_queryset()
+        else:
+            queryset = getattr(view, f'get_{action}_queryset')()
+        if queryset.query.is_sliced:
+            # Already limited by the view, e.g. the top of a precomputed feed.
+            return queryset
+        paginator = KeysetPagination()
+        page_size = paginator.get_page_size(view.request)
+        return queryset.order_by(*paginator.get_ordering(view))[:page_size + 1]
+
+    def find_full_scans(self, plan):
+        pattern = POSTGRES_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+        return sorted(set(pattern.findall(plan)))
+
+    def seed(self, rows):
+        now = timezone.now()
+        suffix = now.strftime('%H%M%S%f')
+        admin = User.objects.create_user(
+            username=f'advisor-admin-{suffix}', password='x', role=User.Role.ADMIN, is_staff=True
+        )
+        providers = User.objects.bulk_create([
+            User(username=f'advisor-provider-{suffix}-{i}', role=User.Role.PROVIDER) for i in range(10)
+        ])
+        seekers = User.objects.bulk_create([
+            User(username=f'advisor-seeker-{suffix}-{i}', role=User.Role.SEEKER) for i in range(50)
+        ])
+        categories = list(FoodListing.Category.values)
+        statuses = list(FoodListing.Status.values)
+        listings = []
+        for i in range(rows):
+            listing = FoodListing(
+                provider=providers[i % len(providers)],
+                title=f'Seed listing {i} rice',
+                description='Seeded by advise_indexes',
+                quantity='1',
+                expiry_date=now + timedelta(hours=1 + i % 72),
+                status=statuses[i % len(statuses)],
+                category=categories[i % len(categories)],
+                latitude=4.0 + (i % 100) / 1000,
+                longitude=9.7 + (i % 100) / 1000,
+            )
+            listing.assign_geohash()
+            listings.append(listing)
+        listings = FoodListing.objects.bulk_create(listings)
+        FoodApplication.objects.bulk_create([
+            FoodApplication(listing=listings[i % len(listings)], seeker=seekers[i % len(seekers)])
+            for i in range(rows)
+        ])
+        FeedEntry.objects.bulk_create([
+            FeedEntry(seeker=seekers[i % len(seekers)], listing=listings[i], score=i / rows) for i in range(rows)
+        ])
+        Notification.objects.bulk_create([
+            Notification(user=seekers[i % len(seekers)], message='Seeded') for i in range(rows)
+        ])
+        SupportTicket.objects.bulk_create([
+            SupportTicket(user=seekers[i % len(seekers)], subject='Seeded', message='Seeded') for i in range(rows)
+        ])
+        PaymentTransaction.objects.bulk_create([
+            PaymentTransaction(user=seekers[i % len(seekers)], amount=1, provider_ref=f'seed-{suffix}-{i}')
+            for i in range(rows)
+        ])
+        return {
+            None: None,
+            User.Role.ADMIN: admin,
+            User.Role.PROVIDER: providers[0],
+            User.Role.SEEKER: seekers[0],
+        }
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from listings.expiry import DEFAULT_BATCH_SIZE, expire_listings
+from matching.worker import feed_worker
+
+
+class Command(BaseCommand):
+    help = "Marks AVAILABLE listings whose expiry_date has passed as EXPIRED."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds.')
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_listings(batch_size=options['batch_size'])
+            # Expired listings leave seekers' feeds on the background feed worker.
+            feed_worker.flush()
+            self.stdout.write(f'Expired {expired} listings.')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
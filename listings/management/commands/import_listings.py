@@ -0,0 +1,46 @@
+import codecs
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from listings import importers
+from matching.worker import feed_worker
+from notifications.dispatch import dispatcher
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Bulk imports food listings for a provider from a CSV or JSON Lines file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--provider', required=True, help='Username of the provider who owns the listings.')
+        parser.add_argument('--format', choices=importers.FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=importers.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            provider = User.objects.get(username=options['provider'])
+        except User.DoesNotExist:
+            raise CommandError(f"Provider {options['provider']!r} does not exist")
+        if provider.role != User.Role.PROVIDER and not provider.is_staff:
+            raise CommandError(f'{provider.username} is not a provider')
+
+        fmt = options['format'] or importers.detect_format(options['path'])
+        if options['path'] == '-':
+            result = importers.import_listings(
+                codecs.getreader('utf-8')(sys.stdin.buffer), fmt, provider, options['chunk_size']
+            )
+        else:
+            with open(options['path'], encoding='utf-8', newline='') as stream:
+                result = importers.import_listings(stream, fmt, provider, options['chunk_size'])
+
+        # The "new listings" notifications and feed updates are written by background threads.
+        dispatcher.flush()
+        feed_worker.flush()
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(f'Created {result.created} listings, {result.failed} rows failed.'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0002_foodlisting_category_foodlisting_pickup_location_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodlisting',
+            index=models.Index(fields=['created_at', 'id'], name='listing_created_id_idx'),
+        ),
+    ]
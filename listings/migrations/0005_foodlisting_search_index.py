@@ -0,0 +1,68 @@
+from django.db import migrations
+
+# Kept here rather than imported from listings.search, so later changes to
+# that module can't change what this migration did.
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS listings_foodlisting_fts USING fts5(
+        title, description,
+        content='listings_foodlisting', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_foodlisting_fts_ai AFTER INSERT ON listings_foodlisting BEGIN
+        INSERT INTO listings_foodlisting_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_foodlisting_fts_ad AFTER DELETE ON listings_foodlisting BEGIN
+        INSERT INTO listings_foodlisting_fts(listings_foodlisting_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS listings_foodlisting_fts_au AFTER UPDATE OF title, description ON listings_foodlisting
+    BEGIN
+        INSERT INTO listings_foodlisting_fts(listings_foodlisting_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO listings_foodlisting_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO listings_foodlisting_fts(listings_foodlisting_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS listings_foodlisting_fts_ai',
+    'DROP TRIGGER IF EXISTS listings_foodlisting_fts_ad',
+    'DROP TRIGGER IF EXISTS listings_foodlisting_fts_au',
+    'DROP TABLE IF EXISTS listings_foodlisting_fts',
+]
+PG_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS listing_search_gin_idx ON listings_foodlisting USING gin (("
+    "to_tsvector('english', coalesce(\"listings_foodlisting\".\"title\", '') "
+    "|| ' ' || coalesce(\"listings_foodlisting\".\"description\", ''))))",
+]
+PG_UNINSTALL = ['DROP INDEX IF EXISTS listing_search_gin_idx']
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0004_foodlisting_coordinates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_INSTALL, 'postgresql': PG_INSTALL}),
+            run({'sqlite': SQLITE_UNINSTALL, 'postgresql': PG_UNINSTALL}),
+        ),
+    ]
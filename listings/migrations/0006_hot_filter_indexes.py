@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0005_foodlisting_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodlisting',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='listing_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlisting',
+            index=models.Index(fields=['status', 'category', 'created_at'], name='listing_status_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodlisting',
+            index=models.Index(fields=['provider', 'status'], name='listing_provider_status_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='foodlisting',
+            index=models.Index(fields=['status', 'expiry_date'], name='listing_status_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:55
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_quantity_available(apps, schema_editor):
+    FoodListing = apps.get_model('listings', 'FoodListing')
+    last_id = 0
+    while True:
+        listings = list(FoodListing.objects.filter(id__gt=last_id).order_by('id').only('id', 'quantity')[:1000])
+        if not listings:
+            return
+        for listing in listings:
+            match = re.search(r'\d+', listing.quantity or '')
+            listing.quantity_available = int(match.group()) if match else 1
+        FoodListing.objects.bulk_update(listings, ['quantity_available'])
+        last_id = listings[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_foodlisting_status_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlisting',
+            name='quantity_available',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(backfill_quantity_available, migrations.RunPython.noop),
+    ]
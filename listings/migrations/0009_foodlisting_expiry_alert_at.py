@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0008_foodlisting_quantity_available'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlisting',
+            name='expiry_alert_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_applications(apps, schema_editor):
+    FoodApplication = apps.get_model('applications', 'FoodApplication')
+    FoodListing = apps.get_model('listings', 'FoodListing')
+
+    def counted(status):
+        per_listing = (
+            FoodApplication.objects.filter(listing_id=OuterRef('pk'), status=status)
+            .values('listing_id').annotate(n=Count('id')).values('n')
+        )
+        return Coalesce(Subquery(per_listing), Value(0))
+
+    FoodListing.objects.update(
+        pending_applications=counted('PENDING'), approved_applications=counted('APPROVED')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0006_active_application_unique'),
+        ('listings', '0009_foodlisting_expiry_alert_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodlisting',
+            name='approved_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='foodlisting',
+            name='pending_applications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_applications, migrations.RunPython.noop),
+    ]
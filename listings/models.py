@@ -1,8 +1,18 @@
+import re
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.validators import MaxValueValidator, MinValueValidator
+from . import geo
 
 User = get_user_model()
 
+
+def parse_quantity(text, default=1):
+    """Best-effort unit count from the free-text quantity, e.g. "10 loaves" -> 10."""
+    match = re.search(r'\d+', text or '')
+    return int(match.group()) if match else default
+
+
 class FoodListing(models.Model):
     class Status(models.TextChoices):
         AVAILABLE = 'AVAILABLE', 'Available'
@@ -20,14 +30,47 @@ class FoodListing(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     quantity = models.CharField(max_length=100)
+    # Units still up for grabs; approvals reserve from it atomically.
+    quantity_available = models.PositiveIntegerField(default=1)
+    # Maintained by applications.allocation so provider views never aggregate applications.
+    pending_applications = models.PositiveIntegerField(default=0, editable=False)
+    approved_applications = models.PositiveIntegerField(default=0, editable=False)
     expiry_date = models.DateTimeField()
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.AVAILABLE)
     category = models.CharField(max_length=20, choices=Category.choices, default=Category.OTHER)
     pickup_location = models.TextField(blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
     pickup_time_window = models.CharField(max_length=100, blank=True, null=True)
+    # Set once matching.urgency has pushed the listing to nearby seekers.
+    expiry_alert_at = models.DateTimeField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     image = models.ImageField(upload_to='listings/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='listing_created_id_idx'),
+            models.Index(fields=['status', 'geohash'], name='listing_status_geohash_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='listing_status_created_idx'),
+            models.Index(fields=['status', 'category', 'created_at'], name='listing_status_category_idx'),
+            models.Index(fields=['provider', 'status'], name='listing_provider_status_idx'),
+            models.Index(fields=['status', 'expiry_date'], name='listing_status_expiry_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    def assign_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            self.geohash = None
+        else:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+
+    def save(self, *args, **kwargs):
+        self.assign_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
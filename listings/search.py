@@ -0,0 +1,116 @@
+"""
+Full-text search over FoodListing.title and description.
+
+Postgres gets a GIN index on a ``tsvector`` expression and SQLite gets an FTS5
+table kept in sync by triggers, so both are updated incrementally by the
+database on every insert, update and delete (including ``bulk_create`` and
+``QuerySet.update``). SQLite drops triggers whenever a migration rebuilds the
+table, so they are re-created after every migrate. ``search()`` filters a
+queryset to the matching rows and annotates ``search_rank`` (higher is
+better). Other backends fall back to ``icontains``.
+"""
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+LISTING_TABLE = 'listings_foodlisting'
+FTS_TABLE = 'listings_foodlisting_fts'
+PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(\"listings_foodlisting\".\"title\", '') "
+    "|| ' ' || coalesce(\"listings_foodlisting\".\"description\", ''))"
+)
+
+# Also in migration 0005; re-run after migrations that rebuild the table.
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='{LISTING_TABLE}', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+
+def ensure_installed(using='default', **kwargs):
+    """
+    post_migrate hook. SQLite migrations that alter FoodListing rebuild the
+    table, which silently drops its triggers; put them back and reindex.
+    """
+    connection_ = connections[using]
+    if connection_.vendor != 'sqlite':
+        return
+    with connection_.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s",
+            [LISTING_TABLE],
+        )
+        if cursor.fetchone()[0] >= 3:
+            return
+        for statement in SQLITE_INSTALL:
+            cursor.execute(statement)
+
+
+def fts5_query(text):
+    """
+    Quote every word so user input can't inject FTS5 syntax; the last word
+    is a prefix match to support search-as-you-type.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(queryset, text):
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = fts5_query(text)
+        if match is None:
+            return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        # Joined once, so the MATCH runs once per query and bm25() reads the row
+        # it produced; a correlated rank subquery would re-run it for every row.
+        matching = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'"{FTS_TABLE}".rowid = "{LISTING_TABLE}"."id"', f'"{FTS_TABLE}" MATCH %s'],
+            params=[match],
+        )
+        return matching.annotate(search_rank=RawSQL(f'-bm25("{FTS_TABLE}")', (), output_field=FloatField()))
+    if vendor == 'postgresql':
+        matches = RawSQL(
+            f"{PG_DOCUMENT} @@ websearch_to_tsquery('english', %s)", (text,), output_field=BooleanField()
+        )
+        # ts_rank is a float4; as float8 it round-trips through the cursor exactly,
+        # so the seek filter can't match the boundary row again.
+        rank = RawSQL(
+            f"ts_rank({PG_DOCUMENT}, websearch_to_tsquery('english', %s))::float8", (text,), output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+    return queryset.filter(
+        Q(title__icontains=text) | Q(description__icontains=text)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
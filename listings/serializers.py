@@ -1,14 +1,57 @@
 from rest_framework import serializers
-from .models import FoodListing
+from .models import FoodListing, parse_quantity
+
+# Bookkeeping only the listing's provider and admins get to see.
+OWNER_ONLY_FIELDS = ('pending_applications', 'approved_applications', 'expiry_alert_at')
+
 
 class FoodListingSerializer(serializers.ModelSerializer):
     provider_name = serializers.ReadOnlyField(source='provider.username')
+    # Only present on ?near= queries, where the queryset annotates it.
+    distance_km = serializers.FloatField(read_only=True)
 
     class Meta:
         model = FoodListing
         fields = '__all__'
         read_only_fields = ('provider', 'status', 'created_at', 'updated_at')
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.instance is not None:
+            # Once a listing exists its units only move through applications.allocation (see restock).
+            fields['quantity_available'].read_only = True
+        return fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not self.is_owner_or_admin(instance):
+            for name in OWNER_ONLY_FIELDS:
+                data.pop(name, None)
+        return data
+
+    def is_owner_or_admin(self, instance):
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return False
+        user = request.user
+        return user.role == user.Role.ADMIN or user.is_staff or user.id == instance.provider_id
+
+    def validate(self, attrs):
+        latitude = attrs.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = attrs.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("Provide both latitude and longitude, or neither.")
+        return attrs
+
     def create(self, validated_data):
         validated_data['provider'] = self.context['request'].user
+        validated_data.setdefault('quantity_available', parse_quantity(validated_data.get('quantity')))
         return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Save only what the client sent: a full-row save would write back the
+        # inventory and application counters as they were when the row was read.
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent after a set-based status change that bypasses Model.save(), so
+# post_save receivers never see it. Arguments: ``listing_ids``,
+# ``old_status``, ``new_status`` and ``provider_counts`` (provider id ->
+# number of that provider's listings that changed).
+listings_status_changed = Signal()
+
+# Sent on commit after listings are created, whether one at a time through
+# the API or in chunks by the bulk importer. Arguments: ``listings``.
+listings_created = Signal()
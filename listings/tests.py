@@ -1,3 +1,376 @@
-from django.test import TestCase
+import base64
+import codecs
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from food_connect_project.testing import QueryCountGuardMixin, create_listing, create_user
+from notifications.dispatch import dispatcher
+from notifications.models import Notification
+
+from . import importers
+from .expiry import expire_listings
+from .models import FoodListing
+from .signals import listings_status_changed
+
+User = get_user_model()
+
+
+class ListingPaginationTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        created_at = timezone.now()
+        for i in range(7):
+            FoodListing.objects.create(
+                provider=self.provider,
+                title=f'Listing {i}',
+                description='Bread',
+                quantity='5',
+                expiry_date=timezone.now() + timedelta(days=1),
+            )
+        # Identical timestamps force the id tie-breaker to do its job.
+        FoodListing.objects.update(created_at=created_at)
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        url = '/api/listings/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        expected = list(FoodListing.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_page_size_is_capped(self):
+        with self.settings(KEYSET_PAGINATION={'MAX_PAGE_SIZE': 2}):
+            response = self.client.get('/api/listings/?page_size=50')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/listings/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values_are_rejected(self):
+        for position in (['abc', 'x'], [None, 1], ['2026-01-01T00:00:00Z', [1]]):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get('/api/listings/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, position)
+
+
+class ListingQueryCountTests(QueryCountGuardMixin, APITestCase):
+    def add_listings(self, count):
+        for i in range(count):
+            create_listing(create_user(User.Role.PROVIDER), title=f'Listing {i}')
+
+    def test_browse_query_count_is_constant(self):
+        self.add_listings(2)
+        self.assertQueryCountConstant('/api/listings/?page_size=50', self.add_listings)
+
+    def test_admin_list_query_count_is_constant(self):
+        admin = User.objects.create_superuser(username='admin', password='pass12345', role=User.Role.ADMIN)
+        self.client.force_authenticate(admin)
+        self.add_listings(2)
+        self.assertQueryCountConstant('/api/listings/?page_size=50', self.add_listings)
+
+
+class ListingNearSearchTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.places = {
+            'centre': (4.0511, 9.7679),
+            'two_km': (4.0691, 9.7679),
+            'thirty_km': (4.3209, 9.7679),
+        }
+        for title, (latitude, longitude) in self.places.items():
+            FoodListing.objects.create(
+                provider=self.provider,
+                title=title,
+                description='Plantains',
+                quantity='3',
+                expiry_date=timezone.now() + timedelta(days=1),
+                latitude=latitude,
+                longitude=longitude,
+            )
+
+    def test_near_returns_listings_within_radius_sorted_by_distance(self):
+        response = self.client.get('/api/listings/?near=4.0511,9.7679&radius_km=5')
+        self.assertEqual(response.status_code, 200)
+        titles = [row['title'] for row in response.data['results']]
+        self.assertEqual(titles, ['centre', 'two_km'])
+        self.assertAlmostEqual(response.data['results'][1]['distance_km'], 2.0, places=1)
+
+    def test_wider_radius_includes_far_listing(self):
+        response = self.client.get('/api/listings/?near=4.0511,9.7679&radius_km=50&page_size=1')
+        titles = [response.data['results'][0]['title']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            titles.extend(row['title'] for row in response.data['results'])
+        self.assertEqual(titles, ['centre', 'two_km', 'thirty_km'])
+
+    def test_malformed_near_is_rejected(self):
+        response = self.client.get('/api/listings/?near=somewhere')
+        self.assertEqual(response.status_code, 400)
+
+
+class ListingSearchTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+
+    def create_listing(self, title, description):
+        return create_listing(self.provider, title=title, description=description)
+
+    def search(self, text):
+        response = self.client.get('/api/listings/', {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data['results']]
+
+    def test_results_are_ranked(self):
+        self.create_listing('Fresh tomatoes', 'Tomatoes and more tomatoes from the farm')
+        self.create_listing('Vegetable box', 'Carrots, onions and a few tomatoes')
+        self.create_listing('Bread', 'Day old loaves')
+        self.assertEqual(self.search('tomatoes'), ['Fresh tomatoes', 'Vegetable box'])
+
+    def test_index_follows_updates_and_deletes(self):
+        listing = self.create_listing('Rice', 'Two bags of rice')
+        self.assertEqual(self.search('rice'), ['Rice'])
+        listing.title = 'Beans'
+        listing.description = 'Two bags of beans'
+        listing.save()
+        self.assertEqual(self.search('rice'), [])
+        self.assertEqual(self.search('bean'), ['Beans'])
+        listing.delete()
+        self.assertEqual(self.search('beans'), [])
+
+    def test_query_syntax_is_escaped(self):
+        self.create_listing('Milk', 'Fresh milk')
+        self.assertEqual(self.search('"milk" ^('), ['Milk'])
+        self.assertEqual(self.search('***'), [])
+
+    def test_ranked_pages_walk_every_match_once(self):
+        for i in range(5):
+            self.create_listing(f'Soup {i}', 'soup ' * (i + 1))
+        self.create_listing('Bread', 'Day old loaves')
+        seen = []
+        url = '/api/listings/?q=soup&page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if connection.vendor == 'sqlite':
+                self.assertEqual([query['sql'].count('MATCH') for query in queries.captured_queries], [1])
+            seen.extend(row['title'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [f'Soup {i}' for i in range(4, -1, -1)])
+
+
+@override_settings(MATCHING={'ASYNC': False})
+class ListingExpiryTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+
+    def create_listing(self, title, expires_in):
+        return create_listing(self.provider, title=title, expiry_date=timezone.now() + expires_in)
+
+    def test_sweeper_expires_past_due_listings_in_batches(self):
+        for i in range(5):
+            self.create_listing(f'Old {i}', -timedelta(hours=1))
+        fresh = self.create_listing('Fresh', timedelta(hours=1))
+        received = []
+
+        def receiver(**kwargs):
+            received.append(kwargs)
+
+        listings_status_changed.connect(receiver)
+        self.addCleanup(listings_status_changed.disconnect, receiver)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(expire_listings(batch_size=2), 5)
+
+        self.assertEqual(FoodListing.objects.filter(status=FoodListing.Status.EXPIRED).count(), 5)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, FoodListing.Status.AVAILABLE)
+        self.assertEqual(len(received), 3)
+        self.assertEqual(sum(kwargs['provider_counts'][self.provider.id] for kwargs in received), 5)
+
+    def test_sweeper_announces_only_the_listings_it_expired(self):
+        lost = self.create_listing('Lost', -timedelta(hours=2))
+        self.create_listing('Old', -timedelta(hours=1))
+        received = []
+
+        def receiver(**kwargs):
+            received.append(kwargs)
+
+        listings_status_changed.connect(receiver)
+        self.addCleanup(listings_status_changed.disconnect, receiver)
+
+        original_update = QuerySet.update
+
+        def update(queryset, **kwargs):
+            # Another transaction reserves the last units between the read and the UPDATE.
+            if kwargs.get('status') == FoodListing.Status.EXPIRED:
+                original_update(FoodListing.objects.filter(pk=lost.pk), status=FoodListing.Status.PENDING)
+            return original_update(queryset, **kwargs)
+
+        with patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(expire_listings(), 1)
+        self.assertEqual(len(received), 1)
+        self.assertNotIn(lost.id, received[0]['listing_ids'])
+        self.assertEqual(received[0]['provider_counts'], {self.provider.id: 1})
+
+    def test_browse_hides_listings_past_expiry(self):
+        self.create_listing('Stale', -timedelta(minutes=1))
+        self.create_listing('Fresh', timedelta(hours=1))
+        response = self.client.get('/api/listings/')
+        self.assertEqual([row['title'] for row in response.data['results']], ['Fresh'])
+
+    def test_expiring_soon_lists_soonest_first_within_the_window(self):
+        self.create_listing('Stale', -timedelta(minutes=1))
+        self.create_listing('Later', timedelta(hours=30))
+        self.create_listing('Tonight', timedelta(hours=5))
+        self.create_listing('Now', timedelta(minutes=30))
+        response = self.client.get('/api/listings/expiring_soon/', {'page_size': 1})
+        self.assertEqual([row['title'] for row in response.data['results']], ['Now'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['title'] for row in response.data['results']], ['Tonight'])
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/listings/expiring_soon/', {'hours': 48})
+        self.assertEqual([row['title'] for row in response.data['results']], ['Now', 'Tonight', 'Later'])
+
+
+class ListingBrowseCacheTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.create_listing('Cassava')
+
+    def create_listing(self, title):
+        return create_listing(self.provider, title=title, category=FoodListing.Category.FRESH)
+
+    def test_repeat_browse_is_served_from_cache(self):
+        first = self.client.get('/api/listings/?category=FRESH')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/listings/?category=FRESH&utm_source=ad')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/listings/')['ETag']
+        response = self.client.get('/api/listings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_listing_writes_invalidate_cached_pages(self):
+        first = self.client.get('/api/listings/')
+        self.create_listing('Yams')
+        second = self.client.get('/api/listings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual([row['title'] for row in second.data['results']], ['Yams', 'Cassava'])
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False}, MATCHING={'ASYNC': False})
+class ListingBulkImportTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.client.force_authenticate(self.provider)
+        self.expiry = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def test_jsonl_import_reports_errors_per_row(self):
+        lines = [
+            {'title': 'Bread', 'description': 'Loaves', 'quantity': '12 loaves', 'expiry_date': self.expiry},
+            {'title': 'Milk', 'description': 'Cartons', 'quantity': '4', 'expiry_date': 'tomorrow'},
+            {'title': 'Rice', 'description': 'Bags', 'quantity': '3', 'expiry_date': self.expiry, 'category': 'FRESH'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\nnot json\n'
+        response = self.client.generic(
+            'POST', '/api/listings/bulk_import/', body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 4])
+        self.assertIn('expiry_date', response.data['errors'][0]['errors'])
+        bread = FoodListing.objects.get(title='Bread')
+        self.assertEqual(bread.provider, self.provider)
+        self.assertEqual(bread.quantity_available, 12)
+
+    def test_csv_upload_is_imported_in_chunks(self):
+        rows = ['title,description,quantity,expiry_date,latitude,longitude']
+        rows += [f'Item {i},Boxes,{i + 1},{self.expiry},4.05,9.76' for i in range(5)]
+        upload = SimpleUploadedFile('closing.csv', '\n'.join(rows).encode(), content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = importers.import_listings(
+                codecs.getreader('utf-8')(upload), importers.CSV, self.provider, chunk_size=2
+            )
+        self.assertEqual((result.created, result.failed), (5, 0))
+        self.assertTrue(FoodListing.objects.filter(geohash__startswith='s0').exists())
+
+    def test_input_format_overrides_the_file_extension(self):
+        body = f'title,description,quantity,expiry_date\nBread,Loaves,2,{self.expiry}\n'.encode()
+        # A .txt upload would be read as JSON Lines without the override.
+        upload = SimpleUploadedFile('closing.txt', body, content_type='text/plain')
+        response = self.client.post('/api/listings/bulk_import/?input_format=csv', {'file': upload})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 1)
+
+        upload = SimpleUploadedFile('closing.txt', body, content_type='text/plain')
+        response = self.client.post('/api/listings/bulk_import/?input_format=xml', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+
+    def test_seekers_cannot_import(self):
+        seeker = User.objects.create_user(username='seeker', password='pass12345', role=User.Role.SEEKER)
+        self.client.force_authenticate(seeker)
+        response = self.client.generic('POST', '/api/listings/bulk_import/', '{}', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(MATCHING={'ASYNC': False})
+class ImportListingsCommandTests(TransactionTestCase):
+    def test_notifications_are_written_before_the_command_returns(self):
+        provider = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        User.objects.create_user(username='seeker', password='pass12345', role=User.Role.SEEKER)
+        expiry = (timezone.now() + timedelta(days=1)).isoformat()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as upload:
+            upload.write(f'title,description,quantity,expiry_date\nBread,Loaves,2,{expiry}\n')
+        self.addCleanup(os.remove, upload.name)
+
+        deliver = dispatcher.deliver
+        delivered = []
+
+        def slow_deliver(event):
+            time.sleep(0.2)
+            delivered.append(event.message)
+            return deliver(event)
+
+        with self.settings(NOTIFICATIONS={'ASYNC': True}), \
+                patch.object(dispatcher, 'deliver', side_effect=slow_deliver):
+            call_command('import_listings', upload.name, provider=provider.username, stdout=io.StringIO())
+        self.assertEqual(len(delivered), 1)
+        self.assertEqual(Notification.objects.filter(user__username='seeker').count(), 1)
@@ -1,9 +1,24 @@
+import codecs
+from datetime import timedelta
+from functools import reduce
+from operator import or_
 from rest_framework import viewsets, permissions, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.db.models import ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Power, Sqrt
+from django.db import transaction
+from django.utils import timezone
+from . import cache, geo, importers, search
 from .models import FoodListing
+from .signals import listings_created, listings_status_changed
 from .serializers import FoodListingSerializer
 from django.contrib.auth import get_user_model
+from analytics.models import ProviderDailyStats, ProviderStats
+from applications import allocation
+from matching import feeds
 
 User = get_user_model()
 
@@ -18,21 +33,84 @@ class IsProviderOrAdminOrReadOnly(permissions.BasePermission):
             return True
         if request.user.role == User.Role.ADMIN or request.user.is_staff:
             return True
-        return obj.provider == request.user
+        return obj.provider_id == request.user.id
+
+DEFAULT_RADIUS_KM = 10.0
+MAX_RADIUS_KM = 100.0
+MAX_EXPIRING_HOURS = 168
+
+
+def parse_near(params):
+    """Return ``(latitude, longitude, radius_km)`` from ``?near=lat,lon&radius_km=``."""
+    try:
+        latitude, longitude = (float(part) for part in params['near'].split(','))
+        radius_km = float(params.get('radius_km', DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise ValidationError({'near': 'Expected near=<latitude>,<longitude> and a numeric radius_km.'})
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValidationError({'near': 'Coordinates are out of range.'})
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValidationError({'radius_km': f'radius_km must be between 0 and {MAX_RADIUS_KM:g}.'})
+    return latitude, longitude, radius_km
+
+
+def filter_near(queryset, latitude, longitude, radius_km):
+    """
+    Restrict ``queryset`` to listings within ``radius_km`` and annotate
+    ``distance_km``. The geohash cells give indexed range scans; the exact
+    (equirectangular) distance is only evaluated on the rows inside them.
+    """
+    cells = geo.covering_cells(latitude, longitude, radius_km)
+    in_cells = reduce(or_, (Q(geohash__gte=cell, geohash__lt=cell + geo.RANGE_END) for cell in cells))
+    scale = geo.longitude_scale(latitude)
+    distance = ExpressionWrapper(
+        Sqrt(
+            Power(F('latitude') - latitude, 2)
+            + Power((F('longitude') - longitude) * scale, 2)
+        ) * geo.EARTH_KM_PER_DEGREE,
+        output_field=FloatField(),
+    )
+    return queryset.filter(in_cells).annotate(distance_km=distance).filter(distance_km__lte=radius_km)
+
 
 class FoodListingViewSet(viewsets.ModelViewSet):
     queryset = FoodListing.objects.all()
     serializer_class = FoodListingSerializer
     permission_classes = (IsProviderOrAdminOrReadOnly,)
 
+    def is_browsing(self):
+        """Anonymous users and seekers browse the public AVAILABLE listings."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return True
+        return not (user.role in (User.Role.ADMIN, User.Role.PROVIDER) or user.is_staff)
+
+    def is_near_query(self):
+        return self.action == 'list' and self.is_browsing() and 'near' in self.request.query_params
+
+    def is_search_query(self):
+        return self.action == 'list' and self.is_browsing() and bool(self.request.query_params.get('q'))
+
+    def get_pagination_ordering(self):
+        if self.action == 'expiring_soon':
+            return ('expiry_date', 'id')
+        if self.is_near_query():
+            return ('distance_km', 'id')
+        if self.is_search_query():
+            return ('-search_rank', 'id')
+        return ('-created_at', '-id')
+
     def get_queryset(self):
         user = self.request.user
+        # provider_name is read off the joined provider row, not one query per listing
+        listings = FoodListing.objects.select_related('provider')
         if user.is_authenticated and (user.role == User.Role.ADMIN or user.is_staff):
-            return FoodListing.objects.all()
+            return listings
         # Providers see their own, Seekers see available
         if user.is_authenticated and user.role == User.Role.PROVIDER:
-            return FoodListing.objects.filter(provider=user)
-        queryset = FoodListing.objects.filter(status=FoodListing.Status.AVAILABLE)
+            return listings.filter(provider=user)
+        # Rows the expiry sweeper hasn't reached yet are hidden as well.
+        queryset = listings.filter(status=FoodListing.Status.AVAILABLE, expiry_date__gt=timezone.now())
         
         # Filtering
         category = self.request.query_params.get('category')
@@ -42,36 +120,162 @@ class FoodListingViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(category=category)
         if pickup_location:
             queryset = queryset.filter(pickup_location__icontains=pickup_location)
+        if self.is_search_query():
+            queryset = search.search(queryset, self.request.query_params['q'])
+        if self.is_near_query():
+            queryset = filter_near(queryset, *parse_near(self.request.query_params))
             
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if not self.is_browsing():
+            return super().list(request, *args, **kwargs)
+        key = cache.browse_key(request)
+        entry = cache.get_entry(key)
+        if entry is None:
+            entry = cache.set_entry(key, super().list(request, *args, **kwargs).data)
+        headers = {'ETag': entry['etag']}
+        if cache.etag_matches(request, entry['etag']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry['data'], headers=headers)
+
     def perform_create(self, serializer):
         if self.request.user.role != User.Role.PROVIDER and not self.request.user.is_staff:
-             raise permissions.PermissionDenied("Only Providers can create listings.")
-        serializer.save(provider=self.request.user)
+             raise PermissionDenied("Only Providers can create listings.")
+        listing = serializer.save(provider=self.request.user)
+        transaction.on_commit(lambda: listings_created.send(sender=FoodListing, listings=[listing]))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[permissions.IsAuthenticated],
+        parser_classes=[MultiPartParser, importers.CSVStreamParser, importers.JSONLinesStreamParser],
+    )
+    def bulk_import(self, request):
+        if request.user.role != User.Role.PROVIDER and not request.user.is_staff:
+            raise PermissionDenied("Only Providers can create listings.")
+
+        upload = request.data.get('file') if hasattr(request.data, 'get') else None
+        if upload is not None:
+            default_format = importers.detect_format(upload.name)
+            stream = codecs.getreader('utf-8')(upload)
+        elif request.content_type.startswith('text/csv'):
+            default_format, stream = importers.CSV, request.data
+        elif request.content_type.startswith('application/x-ndjson'):
+            default_format, stream = importers.JSONL, request.data
+        else:
+            return Response({'error': 'Upload a CSV or JSON Lines file'}, status=400)
+
+        # Not ?format=, which DRF reserves for picking the response renderer.
+        fmt = request.query_params.get('input_format', default_format)
+        if fmt not in importers.FORMATS:
+            return Response({'error': f'input_format must be one of {", ".join(importers.FORMATS)}'}, status=400)
+        result = importers.import_listings(stream, fmt, request.user)
+        return Response(result.as_dict(), status=status.HTTP_201_CREATED if result.created else 400)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def approve(self, request, pk=None):
         listing = self.get_object()
+        old_status = listing.status
         listing.status = FoodListing.Status.AVAILABLE
-        listing.save()
+        # Only the status: a full save would write back the inventory read above.
+        listing.save(update_fields=['status', 'updated_at'])
+        if old_status != listing.status:
+            transaction.on_commit(lambda: listings_status_changed.send(
+                sender=FoodListing,
+                listing_ids=[listing.pk],
+                old_status=old_status,
+                new_status=listing.status,
+                provider_counts={listing.provider_id: 1},
+            ))
         return Response({'status': 'listing approved'})
 
+    @action(detail=True, methods=['post'])
+    def restock(self, request, pk=None):
+        listing = self.get_object()
+        units = request.data.get('units')
+        if type(units) is not int or not units or abs(units) > allocation.MAX_UNITS:
+            raise ValidationError({'units': 'A non-zero whole number of units to add (negative to remove).'})
+        try:
+            quantity = allocation.restock(listing.pk, units)
+        except allocation.TransitionError as exc:
+            return Response({'error': str(exc)}, status=exc.status_code)
+        return Response({'quantity_available': quantity})
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def analytics(self, request):
         user = request.user
         if user.role != User.Role.PROVIDER:
             return Response({'error': 'Only Providers can view analytics'}, status=403)
-        
-        listings = FoodListing.objects.filter(provider=user)
-        total_listings = listings.count()
-        active_listings = listings.filter(status=FoodListing.Status.AVAILABLE).count()
-        
-        # Simple analytics
+
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            raise ValidationError({'days': 'Must be an integer.'})
+
+        # Totals are maintained incrementally by the analytics app, so this is
+        # a primary key lookup plus a bounded range scan for the daily series.
+        stats = ProviderStats.objects.filter(provider=user).first() or ProviderStats(provider=user)
+        since = timezone.localdate() - timedelta(days=days - 1)
+        daily = ProviderDailyStats.objects.filter(provider=user, day__gte=since).order_by('day').values(
+            'day', 'listings_created', 'applications_received', 'applications_approved',
+            'applications_collected', 'units_collected', 'beneficiaries_served',
+        )
         return Response({
-            'total_listings': total_listings,
-            'active_listings': active_listings,
-            'total_meals_donated': 0, # Placeholder, would need to parse quantity or add a numeric field
-            'impact_score': total_listings * 10 # Placeholder metric
+            'total_listings': stats.listings_total,
+            'active_listings': stats.listings_available,
+            'listings_by_status': {
+                FoodListing.Status.AVAILABLE: stats.listings_available,
+                FoodListing.Status.PENDING: stats.listings_pending,
+                FoodListing.Status.COLLECTED: stats.listings_collected,
+                FoodListing.Status.EXPIRED: stats.listings_expired,
+            },
+            'applications_received': stats.applications_received,
+            'applications_approved': stats.applications_approved,
+            'applications_collected': stats.applications_collected,
+            'total_meals_donated': stats.units_collected,
+            'beneficiaries_served': stats.beneficiaries_served,
+            'impact_score': stats.beneficiaries_served,
+            'daily': list(daily),
         })
 
+    def get_expiring_soon_queryset(self):
+        try:
+            hours = min(max(int(self.request.query_params.get('hours', 24)), 1), MAX_EXPIRING_HOURS)
+        except ValueError:
+            raise ValidationError({'hours': 'Must be an integer.'})
+
+        # A range scan of the (status, expiry_date) index, soonest first.
+        now = timezone.now()
+        queryset = FoodListing.objects.select_related('provider').filter(
+            status=FoodListing.Status.AVAILABLE, expiry_date__gt=now, expiry_date__lte=now + timedelta(hours=hours)
+        )
+        category = self.request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def expiring_soon(self, request):
+        page = self.paginate_queryset(self.get_expiring_soon_queryset())
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    def get_recommended_queryset(self):
+        feed_size = feeds.get_matching_setting('FEED_SIZE')
+        try:
+            limit = min(max(int(self.request.query_params.get('limit', 20)), 1), feed_size)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        return feeds.recommended(self.request.user, limit)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def recommended(self, request):
+        if request.user.role != User.Role.SEEKER:
+            return Response({'error': 'Only Seekers get recommendations'}, status=403)
+
+        # Precomputed by the matching app; nothing is scored or sorted here.
+        entries = list(self.get_recommended_queryset())
+        results = self.get_serializer([entry.listing for entry in entries], many=True).data
+        for row, entry in zip(results, entries):
+            row['score'] = round(entry.score, 4)
+        return Response({'results': results})
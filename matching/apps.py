@@ -0,0 +1,22 @@
+from django.apps import AppConfig
+
+
+class MatchingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'matching'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_save
+        from applications.models import FoodApplication
+        from listings.signals import listings_created, listings_status_changed
+        from . import receivers
+
+        listings_created.connect(receivers.listings_created, dispatch_uid='matching_listings_created')
+        listings_status_changed.connect(
+            receivers.listings_status_changed, dispatch_uid='matching_listings_status_changed'
+        )
+        post_save.connect(
+            receivers.application_created, sender=FoodApplication, dispatch_uid='matching_application_created'
+        )
+        post_save.connect(receivers.user_saved, sender=get_user_model(), dispatch_uid='matching_user_saved')
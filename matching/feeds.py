@@ -0,0 +1,314 @@
+"""
+Precomputed listing recommendations for seekers.
+
+Each AVAILABLE listing is scored for a seeker from four signals, each in
+[0, 1] and combined with ``MATCHING['WEIGHTS']``:
+
+* proximity: 1 at the seeker's location, 0 at ``MAX_DISTANCE_KM``. Listings
+  further away than that are never recommended to a seeker with a location.
+* affinity: the share of the seeker's past applications in the listing's
+  category.
+* urgency: 0 for food with ``URGENCY_HORIZON_HOURS`` or more left, rising to 1
+  at expiry.
+* fit: how much of the seeker's typical ``beneficiaries_count`` the listing's
+  remaining units cover.
+
+The top ``FEED_SIZE`` per seeker live in FeedEntry, so the recommended
+endpoint is an index range scan. New listings are scored against the seekers
+around them as they are created, listings leaving AVAILABLE drop out of every
+feed, and a seeker's feed is rebuilt when they apply for food or move. Those
+updates run on ``matching.worker``, off the request that triggered them.
+``refresh_seekers()`` (``manage.py refresh_feeds``) rebuilds feeds wholesale,
+which also tops up feeds that lost entries and re-weighs urgency as time
+passes.
+"""
+import math
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Avg, Count, F, Min, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from applications.models import FoodApplication
+from listings import geo
+from listings.models import FoodListing
+
+from .models import FeedEntry
+
+User = get_user_model()
+
+CANDIDATE_FIELDS = ('id', 'category', 'latitude', 'longitude', 'expiry_date', 'quantity_available')
+
+
+def get_matching_setting(name):
+    defaults = {
+        'FEED_SIZE': 50,
+        'MAX_DISTANCE_KM': 25.0,
+        'URGENCY_HORIZON_HOURS': 48,
+        # Seekers without a location are matched against this many soonest-expiring listings.
+        'CANDIDATE_LIMIT': 500,
+        'WEIGHTS': {'proximity': 0.4, 'affinity': 0.25, 'urgency': 0.25, 'fit': 0.1},
+        'BATCH_SIZE': 500,
+        # Run feed updates on the background worker instead of the triggering request.
+        'ASYNC': True,
+        # matching.urgency pushes listings to seekers this close to expiry.
+        'ALERT_WINDOW_HOURS': 6,
+        # Listings the urgency scheduler holds in memory at once.
+        'ALERT_QUEUE_SIZE': 1000,
+        # How often an idle urgency scheduler looks for newly posted listings.
+        'ALERT_POLL_SECONDS': 60,
+    }
+    return getattr(settings, 'MATCHING', {}).get(name, defaults[name])
+
+
+class SeekerProfile:
+    def __init__(self, seeker_id, latitude=None, longitude=None):
+        self.seeker_id = seeker_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.categories = Counter()
+        self.beneficiaries = 0.0
+        self.applied = set()
+
+    @property
+    def has_location(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def distance_km(self, listing):
+        if not self.has_location or listing.latitude is None or listing.longitude is None:
+            return None
+        scale = geo.longitude_scale(self.latitude)
+        return math.hypot(
+            listing.latitude - self.latitude, (listing.longitude - self.longitude) * scale
+        ) * geo.EARTH_KM_PER_DEGREE
+
+
+def load_profiles(seeker_ids):
+    """Build profiles for ``seeker_ids`` with three grouped queries, whatever their history."""
+    profiles = {
+        row['id']: SeekerProfile(row['id'], row['latitude'], row['longitude'])
+        for row in User.objects.filter(id__in=seeker_ids).values('id', 'latitude', 'longitude')
+    }
+    applications = FoodApplication.objects.filter(seeker_id__in=list(profiles))
+    for row in applications.values('seeker_id', 'listing__category').annotate(n=Count('id')).order_by():
+        profiles[row['seeker_id']].categories[row['listing__category']] = row['n']
+    for row in applications.values('seeker_id').annotate(avg=Avg('beneficiaries_count')).order_by():
+        profiles[row['seeker_id']].beneficiaries = row['avg'] or 0.0
+    for seeker_id, listing_id in applications.values_list('seeker_id', 'listing_id'):
+        profiles[seeker_id].applied.add(listing_id)
+    return profiles
+
+
+def score(profile, listing, now):
+    """Score ``listing`` for ``profile``, or None when it shouldn't be recommended at all."""
+    if listing.id in profile.applied:
+        return None
+    max_km = get_matching_setting('MAX_DISTANCE_KM')
+    distance = profile.distance_km(listing)
+    if distance is None:
+        # A seeker (or listing) without coordinates isn't near anything.
+        proximity = 0.0
+    elif distance > max_km:
+        return None
+    else:
+        proximity = 1 - distance / max_km
+
+    total = sum(profile.categories.values())
+    affinity = profile.categories[listing.category] / total if total else 0.0
+    hours_left = (listing.expiry_date - now).total_seconds() / 3600
+    urgency = min(max(1 - hours_left / get_matching_setting('URGENCY_HORIZON_HOURS'), 0.0), 1.0)
+    fit = min(listing.quantity_available / profile.beneficiaries, 1.0) if profile.beneficiaries else 1.0
+
+    weights = get_matching_setting('WEIGHTS')
+    return (
+        weights['proximity'] * proximity
+        + weights['affinity'] * affinity
+        + weights['urgency'] * urgency
+        + weights['fit'] * fit
+    )
+
+
+def available_listings(now):
+    return FoodListing.objects.filter(status=FoodListing.Status.AVAILABLE, expiry_date__gt=now).only(*CANDIDATE_FIELDS)
+
+
+def candidates_for(profile, now):
+    listings = available_listings(now)
+    if not profile.has_location:
+        return listings.order_by('expiry_date')[:get_matching_setting('CANDIDATE_LIMIT')]
+    cells = geo.covering_cells(profile.latitude, profile.longitude, get_matching_setting('MAX_DISTANCE_KM'))
+    return listings.filter(reduce(or_, (Q(geohash__gte=cell, geohash__lt=cell + geo.RANGE_END) for cell in cells)))
+
+
+def refresh_seekers(seeker_ids=None, now=None):
+    """Rebuild the feeds of ``seeker_ids`` (every active seeker by default); returns the number rebuilt."""
+    now = now or timezone.now()
+    if seeker_ids is None:
+        seeker_ids = (
+            User.objects.filter(role=User.Role.SEEKER, is_active=True)
+            .order_by('id').values_list('id', flat=True).iterator(chunk_size=2000)
+        )
+    feed_size = get_matching_setting('FEED_SIZE')
+    refreshed = 0
+    for batch in chunked(seeker_ids, get_matching_setting('BATCH_SIZE')):
+        profiles = load_profiles(batch)
+        entries = []
+        for profile in profiles.values():
+            scored = ((score(profile, listing, now), listing.id) for listing in candidates_for(profile, now))
+            top = sorted((item for item in scored if item[0] is not None), reverse=True)[:feed_size]
+            entries.extend(
+                FeedEntry(seeker_id=profile.seeker_id, listing_id=listing_id, score=value) for value, listing_id in top
+            )
+        with transaction.atomic():
+            FeedEntry.objects.filter(seeker_id__in=batch).delete()
+            FeedEntry.objects.bulk_create(entries, batch_size=1000)
+        refreshed += len(profiles)
+    return refreshed
+
+
+def chunked(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bounding_box(listing):
+    """``(latitude_range, longitude_range)`` covering MAX_DISTANCE_KM around ``listing``."""
+    max_km = get_matching_setting('MAX_DISTANCE_KM')
+    lat_delta = max_km / geo.EARTH_KM_PER_DEGREE
+    lon_delta = lat_delta / geo.longitude_scale(listing.latitude)
+    return (
+        (listing.latitude - lat_delta, listing.latitude + lat_delta),
+        (listing.longitude - lon_delta, listing.longitude + lon_delta),
+    )
+
+
+def active_seekers():
+    return User.objects.filter(role=User.Role.SEEKER, is_active=True)
+
+
+def seekers_near(listing):
+    """Ids of active seekers within MAX_DISTANCE_KM of ``listing``, by bounding box on the location index."""
+    latitudes, longitudes = bounding_box(listing)
+    return active_seekers().filter(latitude__range=latitudes, longitude__range=longitudes).values_list('id', flat=True)
+
+
+def seekers_near_listings(listings):
+    """
+    Map each active seeker inside any of the ``listings``' bounding boxes to
+    those listings. The listings are grouped by geohash cells at least
+    MAX_DISTANCE_KM across, with one range query on the location index per
+    cell. Within a cell, a seeker is matched by bisecting the listings sorted
+    by latitude rather than checking every box.
+    """
+    if not listings:
+        return {}
+    max_km = get_matching_setting('MAX_DISTANCE_KM')
+    lat_delta = max_km / geo.EARTH_KM_PER_DEGREE
+    precision = min(geo.precision_for_radius(listing.latitude, max_km) for listing in listings)
+    cells = defaultdict(list)
+    for listing in listings:
+        cells[geo.encode(listing.latitude, listing.longitude, precision)].append(listing)
+
+    nearby = defaultdict(list)
+    for group in cells.values():
+        group.sort(key=lambda listing: listing.latitude)
+        latitudes = [listing.latitude for listing in group]
+        longitudes = [bounding_box(listing)[1] for listing in group]
+        seekers = active_seekers().filter(
+            latitude__range=(latitudes[0] - lat_delta, latitudes[-1] + lat_delta),
+            longitude__range=(min(lo for lo, _ in longitudes), max(hi for _, hi in longitudes)),
+        )
+        for seeker_id, latitude, longitude in seekers.values_list('id', 'latitude', 'longitude'):
+            start = bisect_left(latitudes, latitude - lat_delta)
+            end = bisect_right(latitudes, latitude + lat_delta)
+            for index in range(start, end):
+                lon_lo, lon_hi = longitudes[index]
+                if lon_lo <= longitude <= lon_hi:
+                    nearby[seeker_id].append(group[index])
+    return nearby
+
+
+def add_listings(listing_ids, now=None):
+    """
+    Score newly AVAILABLE listings for the seekers around them and slot them
+    into feeds they beat. Listings without coordinates wait for the next
+    full refresh. Works in BATCH_SIZE chunks, with a fixed number of queries
+    per chunk plus one per geohash cell the chunk's listings cover; returns
+    the number of entries written.
+    """
+    now = now or timezone.now()
+    added = 0
+    for batch in chunked(listing_ids, get_matching_setting('BATCH_SIZE')):
+        listings = available_listings(now).filter(id__in=batch, latitude__isnull=False, longitude__isnull=False)
+        added += add_batch(list(listings), now)
+    return added
+
+
+def add_batch(listings, now):
+    nearby = seekers_near_listings(listings)
+    if not nearby:
+        return 0
+
+    feed_size = get_matching_setting('FEED_SIZE')
+    profiles = load_profiles(list(nearby))
+    floors = {
+        row['seeker_id']: row
+        for row in FeedEntry.objects.filter(seeker_id__in=list(nearby)).values('seeker_id').annotate(
+            n=Count('id'), lowest=Min('score')
+        ).order_by()
+    }
+    entries = []
+    for seeker_id, seeker_listings in nearby.items():
+        floor = floors.get(seeker_id)
+        for listing in seeker_listings:
+            value = score(profiles[seeker_id], listing, now)
+            if value is None:
+                continue
+            if floor is None or floor['n'] < feed_size or value > floor['lowest']:
+                entries.append(FeedEntry(seeker_id=seeker_id, listing_id=listing.id, score=value))
+    if not entries:
+        return 0
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=1000, update_conflicts=True, unique_fields=['seeker', 'listing'], update_fields=['score']
+    )
+    trim({entry.seeker_id for entry in entries})
+    return len(entries)
+
+
+def trim(seeker_ids):
+    """Drop the lowest-scoring entries of feeds that grew past FEED_SIZE, with one ranked select and one delete."""
+    ranked = FeedEntry.objects.filter(seeker_id__in=list(seeker_ids)).annotate(
+        rank=Window(RowNumber(), partition_by=F('seeker_id'), order_by=(F('score').desc(), F('id').asc()))
+    )
+    # Materialised: MySQL can't delete from a table it is selecting from.
+    excess = list(ranked.filter(rank__gt=get_matching_setting('FEED_SIZE')).values_list('id', flat=True))
+    if excess:
+        FeedEntry.objects.filter(id__in=excess).delete()
+
+
+def remove_listings(listing_ids):
+    """Drop listings that are no longer AVAILABLE from every feed."""
+    return FeedEntry.objects.filter(listing_id__in=listing_ids).delete()[0]
+
+
+def recommended(seeker, limit, now=None):
+    """The seeker's top ``limit`` still-available listings, best first."""
+    now = now or timezone.now()
+    return (
+        FeedEntry.objects
+        .filter(seeker=seeker, listing__status=FoodListing.Status.AVAILABLE, listing__expiry_date__gt=now)
+        .select_related('listing__provider')
+        .order_by('-score', 'id')[:limit]
+    )
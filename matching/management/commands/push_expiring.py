@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from matching import urgency
+from notifications.dispatch import dispatcher
+
+
+class Command(BaseCommand):
+    help = "Notifies nearby seekers with pending demand about AVAILABLE listings close to expiry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, waking whenever a listing falls due.')
+
+    def handle(self, *args, **options):
+        queue = urgency.ExpiryQueue()
+        while True:
+            pushed = urgency.run_once(queue)
+            # Alerts are written by the notification thread, and a pushed listing is never pushed again.
+            dispatcher.flush()
+            self.stdout.write(f'Pushed {pushed} expiring listings.')
+            if not options['loop']:
+                return
+            time.sleep(urgency.seconds_until_next(queue))
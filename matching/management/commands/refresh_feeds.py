@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from matching.feeds import refresh_seekers
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the precomputed recommendation feeds of seekers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seeker', type=int, action='append', dest='seekers', help='Limit to seeker ids.')
+
+    def handle(self, *args, **options):
+        count = refresh_seekers(options['seekers'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt feeds for {count} seekers.'))
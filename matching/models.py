@@ -0,0 +1,25 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+from listings.models import FoodListing
+
+User = get_user_model()
+
+
+class FeedEntry(models.Model):
+    """One precomputed recommendation; each seeker keeps their top FEED_SIZE, maintained by matching.feeds."""
+    seeker = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    listing = models.ForeignKey(FoodListing, on_delete=models.CASCADE, related_name='feed_entries')
+    score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seeker', 'listing'], name='feed_entry_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['seeker', '-score'], name='feed_entry_seeker_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} for {self.seeker_id} ({self.score:.3f})"
@@ -0,0 +1,31 @@
+from listings.models import FoodListing
+
+from .worker import submit, submit_on_commit
+
+
+# The listing signals are already sent on commit.
+def listings_created(sender, listings, **kwargs):
+    submit('add_listings', [listing.id for listing in listings])
+
+
+def listings_status_changed(sender, listing_ids, new_status, **kwargs):
+    if new_status == FoodListing.Status.AVAILABLE:
+        submit('add_listings', listing_ids)
+    else:
+        submit('remove_listings', listing_ids)
+
+
+def application_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    # Their category history changed and the listing they applied for is done with.
+    submit_on_commit('refresh_seekers', [instance.seeker_id])
+
+
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or instance.role != sender.Role.SEEKER:
+        return
+    # Saves that name their fields (last_login on every login) only matter if they moved.
+    if update_fields is not None and not {'latitude', 'longitude'} & set(update_fields):
+        return
+    submit_on_commit('refresh_seekers', [instance.id])
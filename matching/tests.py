@@ -0,0 +1,275 @@
+import io
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from food_connect_project.testing import apply, create_listing, create_user
+from listings.expiry import expire_listings
+from listings.models import FoodListing
+from notifications.dispatch import dispatcher
+from notifications.models import Notification
+
+from . import feeds, urgency
+from .models import FeedEntry
+from .worker import feed_worker
+
+User = get_user_model()
+
+# Central Nairobi; ~1.1km per 0.01 degrees of latitude.
+LAT, LON = -1.286, 36.817
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False, 'BATCH_SIZE': 100}, MATCHING={'ASYNC': False})
+class RecommendationFeedTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.seeker = User.objects.create_user(
+            username='seeker', password='pass12345', role=User.Role.SEEKER, latitude=LAT, longitude=LON
+        )
+
+    def create_listing(self, lat_offset=0.0, hours_left=24, category=FoodListing.Category.OTHER, units=5):
+        self.client.force_authenticate(self.provider)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/listings/', {
+                'title': 'Meals',
+                'description': 'Hot meals',
+                'quantity': f'{units} plates',
+                'quantity_available': units,
+                'category': category,
+                'latitude': LAT + lat_offset,
+                'longitude': LON,
+                'expiry_date': (timezone.now() + timedelta(hours=hours_left)).isoformat(),
+            })
+        self.assertEqual(response.status_code, 201)
+        return FoodListing.objects.get(pk=response.data['id'])
+
+    def get_recommended(self, **params):
+        self.client.force_authenticate(self.seeker)
+        response = self.client.get('/api/listings/recommended/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_new_listings_are_ranked_into_nearby_feeds(self):
+        far_away = self.create_listing(lat_offset=1.0)
+        further = self.create_listing(lat_offset=0.1)
+        close = self.create_listing(lat_offset=0.01)
+        self.assertFalse(FeedEntry.objects.filter(listing=far_away).exists())
+        self.assertEqual(self.get_recommended(), [close.id, further.id])
+
+    def test_urgency_and_category_history_raise_scores(self):
+        past = self.create_listing(category=FoodListing.Category.COOKED)
+        apply(past, self.seeker)
+        relaxed = self.create_listing(hours_left=72)
+        urgent = self.create_listing(hours_left=2)
+        cooked = self.create_listing(hours_left=72, category=FoodListing.Category.COOKED)
+        feeds.refresh_seekers([self.seeker.id])
+        ranking = self.get_recommended()
+        self.assertNotIn(past.id, ranking)
+        self.assertLess(ranking.index(urgent.id), ranking.index(relaxed.id))
+        self.assertLess(ranking.index(cooked.id), ranking.index(relaxed.id))
+
+    def test_feed_is_capped_and_keeps_the_best(self):
+        with self.settings(MATCHING={'ASYNC': False, 'FEED_SIZE': 2}):
+            self.create_listing(lat_offset=0.15)
+            best = self.create_listing(lat_offset=0.0)
+            second = self.create_listing(lat_offset=0.05)
+            self.create_listing(lat_offset=0.1)
+            self.assertEqual(FeedEntry.objects.filter(seeker=self.seeker).count(), 2)
+            self.assertEqual(self.get_recommended(), [best.id, second.id])
+
+    def test_listings_leaving_available_drop_out(self):
+        listing = self.create_listing()
+        FoodListing.objects.filter(pk=listing.pk).update(expiry_date=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_listings()
+        self.assertFalse(FeedEntry.objects.exists())
+
+    def test_applying_refreshes_the_seekers_feed(self):
+        listing = self.create_listing()
+        self.client.force_authenticate(self.seeker)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/applications/', {'listing': listing.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.get_recommended(), [])
+
+    def test_endpoint_reads_the_precomputed_feed(self):
+        for i in range(5):
+            self.create_listing(lat_offset=i * 0.01)
+        self.client.force_authenticate(self.seeker)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/listings/recommended/?limit=3')
+        self.assertEqual(len(response.data['results']), 3)
+        scores = [row['score'] for row in response.data['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_only_seekers(self):
+        self.client.force_authenticate(self.provider)
+        self.assertEqual(self.client.get('/api/listings/recommended/').status_code, 403)
+
+    def test_adding_listings_takes_a_fixed_number_of_queries(self):
+        for i in range(3):
+            create_user(latitude=LAT + i * 0.01, longitude=LON)
+
+        def add(count):
+            listings = FoodListing.objects.bulk_create(
+                FoodListing(
+                    provider=self.provider, title='Meals', description='Hot meals', quantity='5 plates',
+                    latitude=LAT + i * 0.001, longitude=LON, expiry_date=timezone.now() + timedelta(hours=24),
+                )
+                for i in range(count)
+            )
+            with CaptureQueriesContext(connection) as queries:
+                feeds.add_listings([listing.id for listing in listings])
+            return len(queries)
+
+        with self.settings(MATCHING={'ASYNC': False, 'FEED_SIZE': 2}):
+            self.assertEqual(add(5), add(50))
+            self.assertEqual(FeedEntry.objects.filter(seeker=self.seeker).count(), 2)
+
+    def test_nearby_seekers_are_found_per_cell(self):
+        far_lat = LAT + 5
+        far_seeker = create_user(latitude=far_lat, longitude=LON)
+        create_user(latitude=LAT + 1, longitude=LON)
+        here = [self.create_listing(lat_offset=i * 0.01) for i in range(3)]
+        there = [self.create_listing(lat_offset=5 + i * 0.01) for i in range(2)]
+        edge = self.create_listing(lat_offset=0.2)
+        with self.assertNumQueries(2):
+            nearby = feeds.seekers_near_listings(here + there + [edge])
+        def ids(listings):
+            return sorted(listing.id for listing in listings)
+
+        self.assertEqual(ids(nearby[self.seeker.id]), ids(here + [edge]))
+        self.assertEqual(ids(nearby[far_seeker.id]), ids(there))
+        self.assertEqual(len(nearby), 2)
+
+    def test_feeds_are_updated_off_the_request(self):
+        with self.settings(MATCHING={'ASYNC': True}), patch.object(feed_worker, '_ensure_worker'):
+            listing = self.create_listing()
+        task = feed_worker.queue.get_nowait()
+        feed_worker.queue.task_done()
+        self.assertEqual(task, ('add_listings', [listing.id]))
+        self.assertFalse(FeedEntry.objects.exists())
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False, 'BATCH_SIZE': 100}, MATCHING={'ASYNC': False, 'ALERT_WINDOW_HOURS': 6})
+class ExpiryUrgencyTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.waiting = self.create_seeker('waiting')
+        self.create_seeker('idle')
+        self.far = self.create_seeker('far', lat_offset=1.0)
+        self.elsewhere = self.create_listing(hours_left=48)
+        for seeker in (self.waiting, self.far):
+            apply(self.elsewhere, seeker)
+
+    def create_seeker(self, username, lat_offset=0.0):
+        return create_user(username=username, latitude=LAT + lat_offset, longitude=LON)
+
+    def create_listing(self, hours_left):
+        return create_listing(
+            self.provider, hours_left=hours_left, title=f'{hours_left}h meals', latitude=LAT, longitude=LON
+        )
+
+    def alerts(self):
+        return list(Notification.objects.filter(message__contains='expires within').values_list('user__username', 'message'))
+
+    def test_queue_pops_listings_in_expiry_order_as_they_fall_due(self):
+        later = self.create_listing(hours_left=10)
+        soon = self.create_listing(hours_left=5)
+        sooner = self.create_listing(hours_left=2)
+        queue = urgency.ExpiryQueue()
+        now = timezone.now()
+        queue.refill(now)
+        self.assertEqual(len(queue), 4)
+        self.assertEqual(queue.pop_due(now), [sooner.id, soon.id])
+        self.assertEqual(queue.pop_due(now + timedelta(hours=5)), [later.id])
+        self.assertEqual(urgency.seconds_until_next(queue, now), 60)
+
+    def test_full_queue_makes_room_for_sooner_listings(self):
+        with self.settings(MATCHING={'ASYNC': False, 'ALERT_QUEUE_SIZE': 2}):
+            queue = urgency.ExpiryQueue()
+            self.create_listing(hours_left=30)
+            now = timezone.now()
+            queue.refill(now)
+            sooner = self.create_listing(hours_left=3)
+            queue.refill(now)
+            self.assertEqual(len(queue), 2)
+            self.assertEqual(queue.pop_due(now), [sooner.id])
+
+    def test_due_listings_are_pushed_once_to_nearby_seekers_with_demand(self):
+        urgent = self.create_listing(hours_left=3)
+        queue = urgency.ExpiryQueue()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(urgency.run_once(queue), 1)
+        self.assertEqual(self.alerts(), [('waiting', "'3h meals' near you expires within 3h. Apply before it goes to waste.")])
+        urgent.refresh_from_db()
+        self.assertIsNotNone(urgent.expiry_alert_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(urgency.run_once(urgency.ExpiryQueue()), 0)
+        self.assertEqual(len(self.alerts()), 1)
+
+    def test_listings_extended_after_queueing_are_pushed_when_really_due(self):
+        extended = self.create_listing(hours_left=3)
+        queue = urgency.ExpiryQueue()
+        now = timezone.now()
+        queue.refill(now)
+        FoodListing.objects.filter(pk=extended.pk).update(expiry_date=now + timedelta(hours=170))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(urgency.run_once(queue, now), 0)
+        self.assertEqual(self.alerts(), [])
+        extended.refresh_from_db()
+        self.assertIsNone(extended.expiry_alert_at)
+        self.assertEqual(len(queue), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(urgency.run_once(queue, now + timedelta(hours=166)), 1)
+        self.assertEqual(self.alerts(), [('waiting', "'3h meals' near you expires within 4h. Apply before it goes to waste.")])
+
+    def test_seekers_who_applied_and_listings_that_left_available_are_skipped(self):
+        applied = self.create_listing(hours_left=3)
+        apply(applied, self.waiting)
+        gone = self.create_listing(hours_left=2)
+        FoodListing.objects.filter(pk=gone.pk).update(status=FoodListing.Status.COLLECTED)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(urgency.push_listings([applied.id, gone.id]), 1)
+        self.assertEqual(self.alerts(), [])
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': True}, MATCHING={'ASYNC': False, 'ALERT_WINDOW_HOURS': 6})
+class PushExpiringCommandTests(TransactionTestCase):
+    def test_alerts_are_written_before_the_command_returns(self):
+        provider = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        seeker = User.objects.create_user(
+            username='seeker', password='pass12345', role=User.Role.SEEKER, latitude=LAT, longitude=LON
+        )
+        elsewhere, urgent = (
+            create_listing(provider, hours_left=hours, title=f'{hours}h meals', latitude=LAT, longitude=LON)
+            for hours in (48, 3)
+        )
+        apply(elsewhere, seeker)
+
+        deliver = dispatcher.deliver
+        delivered = []
+
+        def slow_deliver(event):
+            time.sleep(0.2)
+            delivered.append(event.message)
+            return deliver(event)
+
+        with patch.object(dispatcher, 'deliver', side_effect=slow_deliver):
+            call_command('push_expiring', stdout=io.StringIO())
+        self.assertEqual(len(delivered), 1)
+        self.assertTrue(Notification.objects.filter(user=seeker, message__contains=urgent.title).exists())
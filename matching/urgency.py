@@ -0,0 +1,150 @@
+"""
+Pushes listings that are about to expire to the seekers who could still use them.
+
+``ExpiryQueue`` is a min-heap of ``(expiry_date, listing_id)`` over the
+AVAILABLE listings that haven't been pushed yet. It is topped up from the
+``(status, expiry_date)`` index, one bounded range scan per tick, so the
+scheduler never sorts the listings table and always knows when the next
+listing falls inside ``ALERT_WINDOW_HOURS`` of its expiry.
+
+When one does, ``push_listings()`` stamps ``expiry_alert_at`` with a
+conditional UPDATE, so a listing is pushed at most once however many
+schedulers run, and notifies the seekers within ``MAX_DISTANCE_KM`` who have
+demand pending: a PENDING application elsewhere and none for this listing.
+Recipients are resolved by the notification worker, not the scheduler.
+``manage.py push_expiring`` runs the scheduler.
+"""
+import heapq
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from applications.models import FoodApplication
+from listings.models import FoodListing
+from notifications.dispatch import notify
+
+from .feeds import get_matching_setting, seekers_near
+
+
+def alert_window():
+    return timedelta(hours=get_matching_setting('ALERT_WINDOW_HOURS'))
+
+
+def pending_listings():
+    return FoodListing.objects.filter(status=FoodListing.Status.AVAILABLE, expiry_alert_at__isnull=True)
+
+
+class ExpiryQueue:
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def refill(self, now):
+        """
+        Queue the soonest-expiring unpushed listings. Once ALERT_QUEUE_SIZE are held,
+        only listings expiring before the latest queued one get in, and they
+        push it out.
+        """
+        size = get_matching_setting('ALERT_QUEUE_SIZE')
+        rows = pending_listings().filter(expiry_date__gt=now).exclude(id__in=list(self._queued))
+        if len(self._heap) >= size:
+            rows = rows.filter(expiry_date__lt=max(self._heap)[0])
+        return self._push(rows.order_by('expiry_date', 'id').values_list('expiry_date', 'id')[:size])
+
+    def requeue(self, listing_ids, now):
+        """
+        Queue ``listing_ids`` again under their current expiry_date when they
+        are still unpushed but no longer due, e.g. a provider extended them
+        after they were queued.
+        """
+        horizon = now + alert_window()
+        rows = pending_listings().filter(id__in=listing_ids, expiry_date__gt=horizon).exclude(id__in=list(self._queued))
+        return self._push(rows.values_list('expiry_date', 'id'))
+
+    def _push(self, rows):
+        added = 0
+        for expiry_date, listing_id in rows:
+            heapq.heappush(self._heap, (expiry_date, listing_id))
+            self._queued.add(listing_id)
+            added += 1
+        size = get_matching_setting('ALERT_QUEUE_SIZE')
+        if len(self._heap) > size:
+            # A sorted list is a valid heap.
+            self._heap = heapq.nsmallest(size, self._heap)
+            self._queued = {listing_id for _, listing_id in self._heap}
+        return added
+
+    def pop_due(self, now):
+        """Ids of queued listings inside the alert window; ones already expired are dropped."""
+        horizon = now + alert_window()
+        due = []
+        while self._heap and self._heap[0][0] <= horizon:
+            expiry_date, listing_id = heapq.heappop(self._heap)
+            self._queued.discard(listing_id)
+            if expiry_date > now:
+                due.append(listing_id)
+        return due
+
+    def next_due(self):
+        """When the head of the queue enters the alert window, or None when it's empty."""
+        if not self._heap:
+            return None
+        return self._heap[0][0] - alert_window()
+
+
+def seekers_with_demand(listing):
+    """Nearby active seekers with a PENDING application who haven't applied for ``listing``."""
+    waiting = FoodApplication.objects.filter(status=FoodApplication.Status.PENDING).values('seeker_id')
+    applied = FoodApplication.objects.filter(listing_id=listing.id).values('seeker_id')
+    return seekers_near(listing).filter(id__in=waiting).exclude(id__in=applied).iterator(chunk_size=2000)
+
+
+def push_listings(listing_ids, now=None):
+    """
+    Stamp and announce the still-unpushed, still-AVAILABLE ``listing_ids``
+    that are inside the alert window now; returns how many.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        listings = list(
+            pending_listings()
+            # expiry_date may have moved since the listing was queued.
+            .filter(id__in=listing_ids, expiry_date__gt=now, expiry_date__lte=now + alert_window())
+            .select_for_update(skip_locked=True)
+            .only('id', 'title', 'expiry_date', 'latitude', 'longitude')
+        )
+        claimed = {listing.id for listing in listings}
+        pending_listings().filter(id__in=claimed).update(expiry_alert_at=now)
+        for listing in listings:
+            if listing.latitude is None or listing.longitude is None:
+                continue
+            hours = math.ceil((listing.expiry_date - now).total_seconds() / 3600)
+            message = f"'{listing.title}' near you expires within {hours}h. Apply before it goes to waste."
+            notify(message, lambda listing=listing: seekers_with_demand(listing))
+    return len(claimed)
+
+
+def run_once(queue, now=None):
+    """One scheduler tick: top up the queue and push whatever is due; returns listings pushed."""
+    now = now or timezone.now()
+    queue.refill(now)
+    due = queue.pop_due(now)
+    if not due:
+        return 0
+    pushed = push_listings(due, now)
+    queue.requeue(due, now)
+    return pushed
+
+
+def seconds_until_next(queue, now=None):
+    now = now or timezone.now()
+    poll = get_matching_setting('ALERT_POLL_SECONDS')
+    next_due = queue.next_due()
+    if next_due is None:
+        return poll
+    return min(max((next_due - now).total_seconds(), 0), poll)
@@ -0,0 +1,79 @@
+"""
+Background feed maintenance.
+
+Feed updates triggered by writes (listings created or changing status, a
+seeker applying or moving) are handed on commit to one daemon thread, so a
+request never waits for the seekers around a listing to be scored. Tasks run
+in the order they were submitted. ``MATCHING['ASYNC'] = False`` runs them
+synchronously instead (handy in tests). The queue is drained at interpreter
+exit, and one-shot callers such as management commands should call
+``feed_worker.flush()`` before they report success. Anything lost when a
+process is killed is repaired by ``manage.py refresh_feeds``.
+"""
+import atexit
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections, transaction
+
+from . import feeds
+
+logger = logging.getLogger(__name__)
+
+TASKS = {
+    'add_listings': feeds.add_listings,
+    'remove_listings': feeds.remove_listings,
+    'refresh_seekers': feeds.refresh_seekers,
+}
+
+
+class FeedWorker:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, task, ids):
+        if not feeds.get_matching_setting('ASYNC'):
+            TASKS[task](ids)
+            return
+        self._ensure_worker()
+        self.queue.put((task, ids))
+
+    def flush(self):
+        """Block until every submitted task has run."""
+        self.queue.join()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                if self._worker is None:
+                    # Daemon threads die with the interpreter; finish what's queued first.
+                    atexit.register(self.flush)
+                self._worker = threading.Thread(target=self._run, name='matching-feeds', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            task, ids = self.queue.get()
+            try:
+                TASKS[task](ids)
+            except Exception:
+                logger.exception('Failed to run feed task %s for %s ids', task, len(ids))
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+feed_worker = FeedWorker()
+
+
+def submit(task, ids):
+    """Run ``task`` over ``ids`` in the background; call after the triggering write has committed."""
+    feed_worker.submit(task, list(ids))
+
+
+def submit_on_commit(task, ids):
+    ids = list(ids)
+    transaction.on_commit(lambda: feed_worker.submit(task, ids))
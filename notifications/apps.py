@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
+
+    def ready(self):
+        from django.db.models.signals import post_save
+        from applications.models import FoodApplication
+        from applications.signals import application_status_changed
+        from listings.signals import listings_created
+        from . import receivers
+
+        listings_created.connect(receivers.listings_created, dispatch_uid='notifications_listings_created')
+        post_save.connect(
+            receivers.application_created, sender=FoodApplication, dispatch_uid='notifications_application_created'
+        )
+        application_status_changed.connect(
+            receivers.application_status_changed, dispatch_uid='notifications_application_status_changed'
+        )
@@ -0,0 +1,79 @@
+"""
+Pub/sub between the notification dispatcher and open SSE streams.
+
+The broker is pluggable through ``NOTIFICATIONS['BROKER']``. The default
+InMemoryBroker only reaches streams held open by the same process, which
+fits a single ASGI worker; a multi-process deployment would plug in a broker
+backed by Redis pub/sub or Postgres LISTEN/NOTIFY with the same interface.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    def subscribe(self, user_id):
+        """Return an asyncio.Queue that receives payloads published for ``user_id``."""
+        raise NotImplementedError
+
+    def unsubscribe(self, user_id, queue):
+        raise NotImplementedError
+
+    def has_subscribers(self, user_id):
+        return True
+
+    def publish(self, user_id, payload):
+        """Deliver ``payload`` to every subscriber of ``user_id``. Safe to call from any thread."""
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    # Slow consumers drop new payloads rather than growing without bound;
+    # they can catch up through the REST endpoint or Last-Event-ID.
+    max_queue_size = 100
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def has_subscribers(self, user_id):
+        return user_id in self._subscribers
+
+    def publish(self, user_id, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, payload)
+
+    @staticmethod
+    def _put(queue, payload):
+        if not queue.full():
+            queue.put_nowait(payload)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(settings, 'NOTIFICATIONS', {}).get('BROKER', 'notifications.broker.InMemoryBroker')
+            _broker = import_string(path)()
+        return _broker
@@ -0,0 +1,130 @@
+"""
+Notification fan-out.
+
+``notify()`` only records an event; the recipients are resolved and the
+Notification rows written by a background worker thread, in ``bulk_create``
+batches of ``BATCH_SIZE``. A request that notifies every seeker on the
+platform therefore costs the same as one that notifies a single user.
+
+Events are queued on transaction commit, so nothing is sent for work that is
+rolled back. The queue lives in process memory and the worker is a daemon
+thread, so the queue is drained at interpreter exit; one-shot callers such as
+management commands should still call ``dispatcher.flush()`` before they
+report success. Events are only lost when the process is killed outright,
+which is acceptable for notifications.
+"""
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import unread
+from .broker import get_broker
+from .models import Notification
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+
+def get_dispatch_setting(name):
+    defaults = {
+        # False writes notifications synchronously on commit (handy in tests).
+        'ASYNC': True,
+        'BATCH_SIZE': 1000,
+    }
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, defaults[name])
+
+
+class NotificationEvent:
+    """
+    One message for a set of recipients. ``recipients`` is an iterable of
+    user ids, or a callable returning one, which is only evaluated by the
+    worker so large audiences are never loaded inside the request.
+    """
+
+    def __init__(self, message, recipients):
+        self.message = message
+        self.recipients = recipients
+
+    def iter_user_ids(self):
+        recipients = self.recipients() if callable(self.recipients) else self.recipients
+        return iter(recipients)
+
+
+class NotificationDispatcher:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, event):
+        if not get_dispatch_setting('ASYNC'):
+            self.deliver(event)
+            return
+        self._ensure_worker()
+        self.queue.put(event)
+
+    def flush(self):
+        """Block until every queued event has been written."""
+        self.queue.join()
+
+    def deliver(self, event):
+        """Write the event's notifications in batches; returns the rows created."""
+        batch_size = get_dispatch_setting('BATCH_SIZE')
+        created = []
+        batch = []
+        for user_id in event.iter_user_ids():
+            batch.append(Notification(user_id=user_id, message=event.message))
+            if len(batch) >= batch_size:
+                created.extend(self.write(batch))
+                batch = []
+        if batch:
+            created.extend(self.write(batch))
+        return created
+
+    def write(self, notifications):
+        created = Notification.objects.bulk_create(notifications)
+        unread.increment(Counter(notification.user_id for notification in created))
+        publish(created)
+        return created
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                if self._worker is None:
+                    # Daemon threads die with the interpreter; write what's queued first.
+                    atexit.register(self.flush)
+                self._worker = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            try:
+                self.deliver(event)
+            except Exception:
+                logger.exception('Failed to deliver notification %r', event.message)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+
+def publish(notifications):
+    """Push freshly written notifications to any open streams of their users."""
+    broker = get_broker()
+    for notification in notifications:
+        if broker.has_subscribers(notification.user_id):
+            broker.publish(notification.user_id, NotificationSerializer(notification).data)
+
+
+dispatcher = NotificationDispatcher()
+
+
+def notify(message, recipients):
+    """Queue ``message`` for ``recipients`` once the current transaction commits."""
+    event = NotificationEvent(message, recipients)
+    transaction.on_commit(lambda: dispatcher.enqueue(event))
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+
+from applications.models import FoodApplication
+
+from .dispatch import notify
+
+User = get_user_model()
+
+STATUS_MESSAGES = {
+    FoodApplication.Status.APPROVED: "Your application for '{title}' was approved.",
+    FoodApplication.Status.REJECTED: "Your application for '{title}' was rejected.",
+    FoodApplication.Status.COLLECTED: "Pickup of '{title}' is confirmed. Thank you!",
+}
+
+
+def active_seeker_ids():
+    return (
+        User.objects.filter(role=User.Role.SEEKER, is_active=True)
+        .values_list('id', flat=True)
+        .iterator(chunk_size=2000)
+    )
+
+
+def listings_created(sender, listings, **kwargs):
+    # A bulk import becomes one summary per provider rather than one per row.
+    by_provider = {}
+    for listing in listings:
+        by_provider.setdefault(listing.provider_id, []).append(listing)
+    for provider_listings in by_provider.values():
+        provider = provider_listings[0].provider
+        name = provider.organization_name or provider.username
+        if len(provider_listings) == 1:
+            message = f"New food available from {name}: {provider_listings[0].title}"
+        else:
+            message = f"{name} just posted {len(provider_listings)} new listings."
+        notify(message, active_seeker_ids)
+
+
+def application_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    listing = instance.listing
+    notify(f"{instance.seeker.username} applied for '{listing.title}'.", [listing.provider_id])
+
+
+def application_status_changed(sender, applications, new_status, **kwargs):
+    template = STATUS_MESSAGES.get(new_status)
+    if template is None:
+        return
+    # A bulk transition is one notification event per listing, not one per seeker.
+    by_listing = {}
+    for application in applications:
+        listing_id = application.listing_id
+        by_listing.setdefault(listing_id, (application.listing.title, []))[1].append(application.seeker_id)
+    for title, seeker_ids in by_listing.values():
+        notify(template.format(title=title), seeker_ids)
@@ -0,0 +1,121 @@
+"""
+Server-Sent Events stream of a user's new notifications.
+
+This is a plain ASGI application mounted in ``food_connect_project.asgi``
+rather than a Django view, so an idle connection costs one coroutine instead
+of a worker thread. Clients authenticate with the usual SimpleJWT access
+token, either as ``Authorization: Bearer <token>`` or, because browsers'
+EventSource can't set headers, as ``?token=<token>``.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .broker import get_broker
+
+STREAM_PATH = '/api/notifications/stream/'
+HEARTBEAT_SECONDS = 15
+REPLAY_LIMIT = 100
+
+
+def get_user_id(scope):
+    """
+    The id of the user the request's access token belongs to, or None. The
+    user is loaded the way JWTAuthentication does it, so deleted users,
+    inactive ones (with ``CHECK_USER_IS_ACTIVE``) and, where enabled,
+    tokens issued before a password change are all rejected.
+    """
+    headers = dict(scope.get('headers') or [])
+    raw = None
+    authorization = headers.get(b'authorization', b'').decode('latin-1')
+    if authorization.startswith('Bearer '):
+        raw = authorization[len('Bearer '):]
+    else:
+        raw = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('token', [None])[0]
+    if not raw:
+        return None
+    try:
+        return JWTAuthentication().get_user(AccessToken(raw)).pk
+    except (TokenError, AuthenticationFailed):
+        return None
+
+
+def format_event(payload):
+    return f"id: {payload['id']}\nevent: notification\ndata: {json.dumps(payload)}\n\n".encode('utf-8')
+
+
+def load_missed(user_id, last_event_id):
+    from .models import Notification
+    from .serializers import NotificationSerializer
+
+    missed = Notification.objects.filter(user_id=user_id, id__gt=last_event_id).order_by('id')[:REPLAY_LIMIT]
+    return NotificationSerializer(missed, many=True).data
+
+
+async def send_json_error(send, status, message):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps({'error': message}).encode('utf-8')})
+
+
+async def notification_stream(scope, receive, send):
+    if scope['method'] != 'GET':
+        await send_json_error(send, 405, 'Method not allowed')
+        return
+    user_id = await sync_to_async(get_user_id)(scope)
+    if user_id is None:
+        await send_json_error(send, 401, 'Authentication credentials were not provided or are invalid')
+        return
+
+    broker = get_broker()
+    queue = broker.subscribe(user_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+
+        last_event_id = dict(scope.get('headers') or []).get(b'last-event-id')
+        if last_event_id and last_event_id.isdigit():
+            for payload in await sync_to_async(load_missed)(user_id, int(last_event_id)):
+                await send({'type': 'http.response.body', 'body': format_event(payload), 'more_body': True})
+
+        while not disconnected.done():
+            next_payload = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {next_payload, disconnected}, timeout=HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_payload in done:
+                body = format_event(next_payload.result())
+            else:
+                next_payload.cancel()
+                if disconnected in done:
+                    break
+                body = b': heartbeat\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broker.unsubscribe(user_id, queue)
+        disconnected.cancel()
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
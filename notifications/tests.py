@@ -1,3 +1,206 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from applications.models import FoodApplication
+from food_connect_project.testing import create_user
+from listings.models import FoodListing
+
+from .broker import get_broker
+from .dispatch import NotificationEvent, dispatcher
+from .models import Notification
+from .streaming import STREAM_PATH, get_user_id, notification_stream
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False, 'BATCH_SIZE': 2}, MATCHING={'ASYNC': False})
+class NotificationFanOutTests(APITestCase):
+    def setUp(self):
+        self.provider = User.objects.create_user(
+            username='provider', password='pass12345', role=User.Role.PROVIDER
+        )
+        self.seekers = [create_user() for _ in range(5)]
+
+    def create_listing(self):
+        self.client.force_authenticate(self.provider)
+        response = self.client.post('/api/listings/', {
+            'title': 'Bread',
+            'description': 'Loaves',
+            'quantity': '10',
+            'expiry_date': (timezone.now() + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+        return FoodListing.objects.get(pk=response.data['id'])
+
+    def test_new_listing_notifies_every_seeker_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_listing()
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)),
+            {seeker.id for seeker in self.seekers},
+        )
+
+    def test_request_does_not_write_notifications(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.create_listing()
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(callbacks)
+
+    def test_application_lifecycle_notifies_provider_and_seeker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self.create_listing()
+        Notification.objects.all().delete()
+        seeker = self.seekers[0]
+
+        self.client.force_authenticate(seeker)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/applications/', {'listing': listing.id})
+        self.assertEqual(Notification.objects.get().user, self.provider)
+
+        self.client.force_authenticate(self.provider)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"/api/applications/{response.data['id']}/update_status/", {'status': 'APPROVED'})
+        self.assertEqual(
+            Notification.objects.get(user=seeker).message, "Your application for 'Bread' was approved."
+        )
+        self.assertEqual(FoodApplication.objects.get().status, FoodApplication.Status.APPROVED)
+
+    def test_deliver_resolves_callable_audience_lazily(self):
+        calls = []
+
+        def audience():
+            calls.append(True)
+            return [seeker.id for seeker in self.seekers]
+
+        event = NotificationEvent('Hello', audience)
+        self.assertEqual(calls, [])
+        self.assertEqual(len(dispatcher.deliver(event)), 5)
+
+
+class NotificationStreamTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='seeker', password='pass12345', role=User.Role.SEEKER)
+        self.token = str(AccessToken.for_user(self.user))
+
+    def scope(self, query_string=b''):
+        return {'type': 'http', 'method': 'GET', 'path': STREAM_PATH, 'headers': [], 'query_string': query_string}
+
+    async def test_stream_pushes_published_notifications(self):
+        received = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        broker = get_broker()
+        task = asyncio.ensure_future(
+            notification_stream(self.scope(b'token=' + self.token.encode()), received.get, send)
+        )
+        while not broker.has_subscribers(self.user.id):
+            await asyncio.sleep(0.01)
+
+        broker.publish(self.user.id, {'id': 7, 'message': 'Approved!'})
+        while not any(b'Approved!' in message.get('body', b'') for message in sent):
+            await asyncio.sleep(0.01)
+        await received.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, timeout=5)
+
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), sent[0]['headers'])
+        self.assertIn(b'id: 7\nevent: notification\n', sent[-1]['body'])
+        self.assertFalse(broker.has_subscribers(self.user.id))
+
+    async def test_stream_requires_a_valid_token(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await notification_stream(self.scope(b'token=garbage'), asyncio.Queue().get, send)
+        self.assertEqual(sent[0]['status'], 401)
+
+    async def test_stream_rejects_inactive_and_deleted_users(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        self.user.is_active = False
+        await sync_to_async(self.user.save)(update_fields=['is_active'])
+        await notification_stream(self.scope(b'token=' + self.token.encode()), asyncio.Queue().get, send)
+        self.assertEqual(sent[0]['status'], 401)
+
+        with patch.object(jwt_authentication.api_settings, 'CHECK_USER_IS_ACTIVE', False):
+            self.assertEqual(await sync_to_async(get_user_id)(self.scope(b'token=' + self.token.encode())), self.user.id)
+
+        await sync_to_async(self.user.delete)()
+        sent.clear()
+        await notification_stream(self.scope(b'token=' + self.token.encode()), asyncio.Queue().get, send)
+        self.assertEqual(sent[0]['status'], 401)
+
+
+@override_settings(NOTIFICATIONS={'ASYNC': False})
+class NotificationReadStateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='seeker', password='pass12345', role=User.Role.SEEKER)
+        self.other = User.objects.create_user(username='other', password='pass12345', role=User.Role.SEEKER)
+        dispatcher.deliver(NotificationEvent('Hello', [self.user.id] * 4 + [self.other.id]))
+        self.client.force_authenticate(self.user)
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def test_unread_count_is_served_from_the_counter(self):
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            self.assertEqual(self.unread_count(), 4)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.unread_count(), 4)
+            dispatcher.deliver(NotificationEvent('Again', [self.user.id]))
+            with self.assertNumQueries(0):
+                self.assertEqual(self.unread_count(), 5)
+
+    def test_per_process_cache_counts_from_the_database(self):
+        self.assertEqual(self.unread_count(), 4)
+        Notification.objects.filter(user=self.user).update(is_read=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.unread_count(), 0)
+
+    def test_mark_read_by_ids_updates_only_own_rows(self):
+        self.assertEqual(self.unread_count(), 4)
+        ids = list(Notification.objects.values_list('id', flat=True))
+        response = self.client.post('/api/notifications/mark_read/', {'ids': ids}, format='json')
+        self.assertEqual(response.data['updated'], 4)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertTrue(Notification.objects.filter(user=self.other, is_read=False).exists())
+
+    def test_mark_all_read_and_single_mark_read(self):
+        notification = Notification.objects.filter(user=self.user).first()
+        self.assertEqual(self.client.post(f'/api/notifications/{notification.id}/mark_read/').status_code, 200)
+        self.assertEqual(self.unread_count(), 3)
+        response = self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(self.unread_count(), 0)
+
+        foreign = Notification.objects.get(user=self.other)
+        self.assertEqual(self.client.post(f'/api/notifications/{foreign.id}/mark_read/').status_code, 404)
+        self.assertEqual(self.client.post('/api/notifications/abc/mark_read/').status_code, 404)
+
+    def test_mark_read_by_ids_rejects_what_is_not_an_id(self):
+        for ids in ([True], [1.0], ['1'], [10 ** 30], [0]):
+            response = self.client.post('/api/notifications/mark_read/', {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, 400, ids)
+        self.assertEqual(self.unread_count(), 4)
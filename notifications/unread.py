@@ -0,0 +1,69 @@
+"""
+Cached per-user unread notification counters.
+
+The counter is incremented when the dispatcher writes notifications and
+decremented by the rows each mark-read UPDATE touched, so the badge endpoint
+is normally a single cache read. A missing counter is rebuilt with one COUNT
+on the partial (user) WHERE NOT is_read index; the TTL bounds how long any
+drift from racing writers can last.
+
+The counter is only kept in a cache every process shares. With a
+per-process backend (LocMem, the fallback in settings) each worker would
+drift on its own, so the count is read from the database every time.
+"""
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import Notification
+
+TIMEOUT = 300
+
+
+def get_cache():
+    """The shared cache holding the counters, or None when the default cache is per-process."""
+    cache = caches['default']
+    return None if isinstance(cache, (LocMemCache, DummyCache)) else cache
+
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def count_unread(user_id):
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def get_unread_count(user_id):
+    cache = get_cache()
+    if cache is None:
+        return count_unread(user_id)
+    count = cache.get(cache_key(user_id))
+    if count is None:
+        count = count_unread(user_id)
+        cache.set(cache_key(user_id), count, TIMEOUT)
+    return count
+
+
+def increment(counts):
+    """``counts`` maps user id -> number of new unread notifications."""
+    cache = get_cache()
+    if cache is None:
+        return
+    for user_id, count in counts.items():
+        try:
+            cache.incr(cache_key(user_id), count)
+        except ValueError:
+            # Not cached; the next read counts from the database.
+            pass
+
+
+def decrement(user_id, count):
+    cache = get_cache()
+    if not count or cache is None:
+        return
+    try:
+        if cache.decr(cache_key(user_id), count) < 0:
+            cache.delete(cache_key(user_id))
+    except ValueError:
+        pass
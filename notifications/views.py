@@ -1,19 +1,51 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from . import unread
 from .models import Notification
 from .serializers import NotificationSerializer
 
+# Largest id a BigAutoField can hold; anything past it can't name a row and breaks the query.
+MAX_ID = 2 ** 63 - 1
+
+
+def is_id(value):
+    # bool is an int subclass; True must not mean notification 1.
+    return type(value) is int and 0 < value <= MAX_ID
+
+
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+    def mark_as_read(self, queryset):
+        """Flag ``queryset`` read with a single UPDATE and keep the unread counter in step."""
+        updated = queryset.filter(is_read=False).update(is_read=True)
+        unread.decrement(self.request.user.id, updated)
+        return updated
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        self.mark_as_read(self.get_queryset().filter(pk=notification.pk))
         return Response({'status': 'marked as read'})
+
+    @action(detail=False, methods=['post'], url_path='mark_read')
+    def mark_read_bulk(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(is_id(pk) for pk in ids):
+            return Response({'error': 'ids must be a list of notification ids'}, status=400)
+        updated = self.mark_as_read(self.get_queryset().filter(pk__in=ids))
+        return Response({'status': 'marked as read', 'updated': updated})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        updated = self.mark_as_read(self.get_queryset())
+        return Response({'status': 'marked as read', 'updated': updated})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': unread.get_unread_count(request.user.id)})
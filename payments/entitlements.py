@@ -0,0 +1,171 @@
+"""
+What a user's subscription entitles them to.
+
+``get_entitlements(user)`` resolves user -> active plan -> ``features`` and
+caches the answer at two levels: a per-process LRU, so a hot user costs no
+network or database round trip at all, and the shared Django cache, so the
+other processes don't each go to the database. Payment webhooks and the
+subscription expiry sweep call ``invalidate()`` on commit, which clears the
+shared entry and this process's LRU entry. Other processes may keep serving
+their LRU copy for up to ``LOCAL_TIMEOUT`` seconds, so that timeout is the
+bound on how stale a gate can be; plan edits are picked up within
+``TIMEOUT``. An entry also stops granting anything once its subscription's
+end_date has passed, even before the sweep deactivates it.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import permissions
+
+from .models import UserSubscription
+
+KEY_PREFIX = 'payments:entitlements:'
+
+
+def get_entitlement_setting(name):
+    defaults = {
+        'ALIAS': 'default',
+        # Seconds an entry lives in the shared cache.
+        'TIMEOUT': 300,
+        # Seconds an entry lives in each process's LRU.
+        'LOCAL_TIMEOUT': 30,
+        'LOCAL_MAX_SIZE': 10000,
+    }
+    return getattr(settings, 'ENTITLEMENTS', {}).get(name, defaults[name])
+
+
+class Entitlements:
+    def __init__(self, plan_id=None, features=None, ends_at=None):
+        self.plan_id = plan_id
+        self.features = features or {}
+        self.ends_at = ends_at
+
+    @property
+    def is_active(self):
+        return self.plan_id is not None and (self.ends_at is None or self.ends_at > time.time())
+
+    def get(self, feature, default=None):
+        return self.features.get(feature, default) if self.is_active else default
+
+    def has(self, feature):
+        return bool(self.get(feature))
+
+    def as_dict(self):
+        return {'plan_id': self.plan_id, 'features': self.features, 'ends_at': self.ends_at}
+
+
+NONE = Entitlements()
+
+
+class LocalLRU:
+    """A small thread-safe LRU whose entries also expire after LOCAL_TIMEOUT."""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + get_entitlement_setting('LOCAL_TIMEOUT'))
+            self._entries.move_to_end(key)
+            while len(self._entries) > get_entitlement_setting('LOCAL_MAX_SIZE'):
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalLRU()
+
+
+def get_shared_cache():
+    return caches[get_entitlement_setting('ALIAS')]
+
+
+def cache_key(user_id):
+    return f'{KEY_PREFIX}{user_id}'
+
+
+def load(user_id):
+    subscription = (
+        UserSubscription.objects
+        .filter(user_id=user_id, is_active=True, plan__isnull=False)
+        .values('plan_id', 'plan__features', 'end_date')
+        .first()
+    )
+    if subscription is None:
+        return NONE
+    return Entitlements(
+        plan_id=subscription['plan_id'],
+        features=subscription['plan__features'],
+        ends_at=subscription['end_date'].timestamp(),
+    )
+
+
+def get_entitlements(user):
+    if not user or not user.is_authenticated:
+        return NONE
+    key = cache_key(user.pk)
+    entitlements = local_cache.get(key)
+    if entitlements is not None:
+        return entitlements
+    shared = get_shared_cache()
+    cached = shared.get(key)
+    if cached is not None:
+        entitlements = Entitlements(**cached)
+    else:
+        entitlements = load(user.pk)
+        shared.set(key, entitlements.as_dict(), get_entitlement_setting('TIMEOUT'))
+    local_cache.set(key, entitlements)
+    return entitlements
+
+
+def invalidate(*user_ids):
+    keys = [cache_key(user_id) for user_id in user_ids]
+    for key in keys:
+        local_cache.delete(key)
+    get_shared_cache().delete_many(keys)
+
+
+def invalidate_on_commit(*user_ids):
+    transaction.on_commit(lambda: invalidate(*user_ids))
+
+
+class HasFeature(permissions.BasePermission):
+    """
+    Grants access when the user's active plan has every feature in the
+    view's ``required_features`` set to a truthy value. Use
+    ``HasFeature.of('feature', ...)`` to name them on the permission instead.
+    """
+    message = 'Your subscription plan does not include this feature.'
+    features = ()
+
+    @classmethod
+    def of(cls, *features):
+        return type(cls.__name__, (cls,), {'features': features})
+
+    def has_permission(self, request, view):
+        features = self.features or getattr(view, 'required_features', ())
+        entitlements = get_entitlements(request.user)
+        return all(entitlements.has(feature) for feature in features)
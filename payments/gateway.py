@@ -0,0 +1,55 @@
+"""
+Clients for asking the payment gateway about a transaction.
+
+The client is pluggable through ``PAYMENT_RECONCILIATION['GATEWAY']``. A real
+deployment points it at a Stripe/Flutterwave client with the same interface;
+the default MockGateway answers from an in-process table, which is what the
+local mock payment flow and the tests use.
+"""
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .models import PaymentTransaction
+
+
+class BaseGateway:
+    def get_status(self, provider_ref):
+        """
+        Return the gateway's view of ``provider_ref``: a
+        PaymentTransaction.Status value. PENDING means it hasn't settled yet.
+        Safe to call from several threads at once.
+        """
+        raise NotImplementedError
+
+
+class MockGateway(BaseGateway):
+    def __init__(self):
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def set_status(self, provider_ref, status):
+        with self._lock:
+            self.statuses[provider_ref] = status
+
+    def reset(self):
+        with self._lock:
+            self.statuses.clear()
+
+    def get_status(self, provider_ref):
+        with self._lock:
+            return self.statuses.get(provider_ref, PaymentTransaction.Status.PENDING)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            path = getattr(settings, 'PAYMENT_RECONCILIATION', {}).get('GATEWAY', 'payments.gateway.MockGateway')
+            _gateway = import_string(path)()
+        return _gateway
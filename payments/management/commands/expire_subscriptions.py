@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.subscriptions import DEFAULT_BATCH_SIZE, expire_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Deactivates subscriptions past their end_date and opens renewal payments for auto-renewing ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds.')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        while True:
+            expired, renewals = expire_subscriptions(batch_size=options['batch_size'])
+            self.stdout.write(f'Expired {expired} subscriptions, opened {renewals} renewal payments.')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
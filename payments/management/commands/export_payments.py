@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from payments import exports
+from payments.models import PaymentTransaction
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Exports payment transactions as CSV or JSON Lines ('-' or no path for stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-')
+        parser.add_argument('--format', choices=exports.FORMATS, default=exports.CSV)
+        parser.add_argument('--since', help='ISO date or datetime; only transactions created from then on.')
+        parser.add_argument('--until', help='ISO date or datetime; only transactions created until then.')
+        parser.add_argument('--user', help='Username to export; defaults to every user.')
+        parser.add_argument('--chunk-size', type=int, default=exports.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = PaymentTransaction.objects.all()
+        if options['user']:
+            try:
+                queryset = queryset.filter(user=User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']!r} does not exist")
+        try:
+            queryset = exports.filter_range(queryset, options['since'], options['until'])
+        except ValidationError as exc:
+            raise CommandError(str(exc.detail))
+
+        lines = exports.export(queryset, options['format'], options['chunk_size'])
+        if options['path'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(options['path'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(lines)
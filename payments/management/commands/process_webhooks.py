@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import get_webhook_setting
+from payments.worker import drain
+
+
+class Command(BaseCommand):
+    help = "Applies received payment webhooks that are due, including retries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Keep draining every --interval seconds.')
+        parser.add_argument('--interval', type=int, default=get_webhook_setting('POLL_SECONDS'))
+
+    def handle(self, *args, **options):
+        while True:
+            attempted = drain(batch_size=options['batch_size'])
+            self.stdout.write(f'Attempted {attempted} webhook events.')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
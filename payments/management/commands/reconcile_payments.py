@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = "Asks the payment gateway about stale PENDING transactions and settles the ones it has an answer for."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--workers', type=int, help='Concurrent gateway lookups.')
+        parser.add_argument('--loop', action='store_true', help='Keep reconciling every --interval seconds.')
+        parser.add_argument('--interval', type=int, default=300)
+
+    def handle(self, *args, **options):
+        while True:
+            result = reconcile(batch_size=options['batch_size'], workers=options['workers'])
+            stats = result.as_dict()
+            self.stdout.write(
+                'Scanned {scanned} transactions in {elapsed_seconds}s ({per_second}/s): {succeeded} succeeded, '
+                '{failed} failed, {pending} still pending, {skipped} already settled, {errors} errors.'.format(**stats)
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
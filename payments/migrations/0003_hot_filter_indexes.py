@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_paymenttransaction_transaction_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymenttransaction',
+            name='provider_ref',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -23,6 +23,11 @@ class UserSubscription(models.Model):
     is_active = models.BooleanField(default=True)
     auto_renew = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'end_date'], name='subscription_active_end_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.plan.name if self.plan else 'No Plan'}"
 
@@ -37,9 +42,48 @@ class PaymentTransaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=3, default='USD')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
-    provider_ref = models.CharField(max_length=100, blank=True, null=True) # Stripe/Flutterwave ID
+    provider_ref = models.CharField(max_length=100, blank=True, null=True, db_index=True) # Stripe/Flutterwave ID
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='transaction_user_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='transaction_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='transaction_status_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.status}"
+
+class WebhookEvent(models.Model):
+    """
+    One row per gateway delivery; the unique delivery_id makes retries no-ops.
+    Rows with no processed_at double as the queue payments.worker drains.
+    """
+    class Result(models.TextChoices):
+        APPLIED = 'APPLIED', 'Applied'
+        IGNORED = 'IGNORED', 'Ignored'
+        FAILED = 'FAILED', 'Failed'
+
+    delivery_id = models.CharField(max_length=255, unique=True)
+    provider_ref = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    result = models.CharField(max_length=20, choices=Result.choices, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                name='webhook_event_due_idx',
+                condition=models.Q(processed_at__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.delivery_id} ({self.result or 'unprocessed'})"
@@ -0,0 +1,138 @@
+"""
+Settling PENDING transactions whose webhook never arrived.
+
+``reconcile()`` walks stale PENDING transactions in keyset batches off the
+(status, created_at, id) index, asks the gateway for each one's status from
+a bounded thread pool, and settles those the gateway reports as final. The
+settlement goes through the webhook event log under a ``reconcile:`` delivery
+id, so it takes the same row locks and is idempotent against a webhook that
+turns up at the same time.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from . import webhooks
+from .gateway import get_gateway
+from .models import PaymentTransaction, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = (PaymentTransaction.Status.SUCCESS, PaymentTransaction.Status.FAILED)
+
+
+def get_reconciliation_setting(name):
+    defaults = {
+        # Only transactions PENDING for longer than this are reconciled.
+        'STALE_AFTER_SECONDS': 900,
+        'BATCH_SIZE': 200,
+        'WORKERS': 8,
+    }
+    return getattr(settings, 'PAYMENT_RECONCILIATION', {}).get(name, defaults[name])
+
+
+class ReconcileResult:
+    def __init__(self):
+        self.scanned = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.pending = 0
+        # Settled by a webhook while we were asking the gateway.
+        self.skipped = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def settled(self):
+        return self.succeeded + self.failed
+
+    @property
+    def per_second(self):
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'scanned': self.scanned,
+            'settled': self.settled,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'pending': self.pending,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'per_second': round(self.per_second, 1),
+        }
+
+
+def reconcile_one(payment_id, provider_ref):
+    """Ask the gateway about one transaction and settle it; returns the gateway status."""
+    try:
+        status = get_gateway().get_status(provider_ref)
+        if status in FINAL_STATUSES:
+            event, created = webhooks.receive(
+                f'reconcile:{provider_ref}:{status}',
+                provider_ref,
+                {'provider_ref': provider_ref, 'status': status, 'source': 'reconciliation'},
+            )
+            if not created or webhooks.process(event.id).result != WebhookEvent.Result.APPLIED:
+                # A webhook or another reconciliation run settled it first.
+                return None
+        return status
+    finally:
+        close_old_connections()
+
+
+def stale_batches(cutoff, batch_size):
+    """Yield lists of ``(id, provider_ref)`` for PENDING transactions created before ``cutoff``."""
+    queryset = PaymentTransaction.objects.filter(
+        status=PaymentTransaction.Status.PENDING, created_at__lte=cutoff, provider_ref__isnull=False
+    ).order_by('created_at', 'id')
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(Q(created_at__gt=last[0]) | Q(created_at=last[0], id__gt=last[1]))
+        rows = list(page.values_list('id', 'provider_ref', 'created_at')[:batch_size])
+        if not rows:
+            return
+        yield [(payment_id, provider_ref) for payment_id, provider_ref, _ in rows]
+        if len(rows) < batch_size:
+            return
+        last = (rows[-1][2], rows[-1][0])
+
+
+def reconcile(now=None, batch_size=None, workers=None):
+    """Settle every stale PENDING transaction the gateway has an answer for."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=get_reconciliation_setting('STALE_AFTER_SECONDS'))
+    batch_size = batch_size or get_reconciliation_setting('BATCH_SIZE')
+    workers = workers or get_reconciliation_setting('WORKERS')
+    result = ReconcileResult()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='payment-reconcile') as pool:
+        for batch in stale_batches(cutoff, batch_size):
+            futures = [pool.submit(reconcile_one, payment_id, ref) for payment_id, ref in batch]
+            for (payment_id, _), future in zip(batch, futures):
+                result.scanned += 1
+                try:
+                    status = future.result()
+                except Exception:
+                    logger.exception('Failed to reconcile payment %s', payment_id)
+                    result.errors += 1
+                    continue
+                if status == PaymentTransaction.Status.SUCCESS:
+                    result.succeeded += 1
+                elif status == PaymentTransaction.Status.FAILED:
+                    result.failed += 1
+                elif status is None:
+                    result.skipped += 1
+                else:
+                    result.pending += 1
+    result.elapsed = time.monotonic() - started
+    return result
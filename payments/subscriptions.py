@@ -0,0 +1,55 @@
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import entitlements
+from .models import PaymentTransaction, UserSubscription
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def expire_subscriptions(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Deactivate active subscriptions whose end_date has passed and open a
+    PENDING renewal transaction for each one with ``auto_renew`` set; the
+    payment webhook reactivates it once the renewal is paid.
+
+    Each batch reads at most ``batch_size`` rows off the (is_active,
+    end_date) index, deactivates them with a single conditional UPDATE and
+    creates the renewals with one ``bulk_create``, so the sweep scales with
+    the number of batches rather than the number of subscribers. Returns
+    ``(expired, renewals)``.
+    """
+    now = now or timezone.now()
+    expired = renewals = 0
+    while True:
+        with transaction.atomic():
+            # Locked rows belong to a concurrent sweep; skip them rather than
+            # open a second renewal for the same subscription.
+            rows = list(
+                UserSubscription.objects
+                .select_for_update(skip_locked=True, of=('self',))
+                .filter(is_active=True, end_date__lte=now)
+                .order_by('end_date')
+                .values_list('id', 'user_id', 'plan_id', 'plan__price', 'auto_renew')[:batch_size]
+            )
+            if not rows:
+                return expired, renewals
+            updated = UserSubscription.objects.filter(id__in=[row[0] for row in rows]).update(is_active=False)
+            entitlements.invalidate_on_commit(*[row[1] for row in rows])
+            created = PaymentTransaction.objects.bulk_create([
+                PaymentTransaction(
+                    user_id=user_id,
+                    plan_id=plan_id,
+                    amount=price,
+                    status=PaymentTransaction.Status.PENDING,
+                    provider_ref=str(uuid.uuid4()),
+                )
+                for _, user_id, plan_id, price, auto_renew in rows
+                if auto_renew and plan_id is not None
+            ], batch_size=batch_size)
+        expired += updated
+        renewals += len(created)
+        if len(rows) < batch_size:
+            return expired, renewals
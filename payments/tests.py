@@ -1,3 +1,360 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework.views import APIView
+
+from food_connect_project.testing import create_user
+
+from . import entitlements, webhooks
+from .gateway import get_gateway
+from .reconciliation import reconcile, reconcile_one
+from .subscriptions import expire_subscriptions
+from .models import PaymentTransaction, SubscriptionPlan, UserSubscription, WebhookEvent
+from .worker import drain
+
+User = get_user_model()
+
+SYNC_WEBHOOKS = {'ASYNC': False, 'MAX_ATTEMPTS': 3, 'BACKOFF_SECONDS': 10}
+
+
+@override_settings(PAYMENT_WEBHOOKS=SYNC_WEBHOOKS)
+class PaymentWebhookTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00', duration_days=30)
+        self.payment = PaymentTransaction.objects.create(
+            user=self.user, plan=self.plan, amount=self.plan.price, provider_ref='ref-1'
+        )
+
+    def deliver(self, status='SUCCESS', event_id='evt-1', provider_ref='ref-1'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                '/api/payments/payments/webhook/',
+                {'provider_ref': provider_ref, 'status': status, 'event_id': event_id},
+                format='json',
+            )
+
+    def test_success_activates_subscription(self):
+        response = self.deliver()
+        self.assertEqual(response.status_code, 202)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.SUCCESS)
+        subscription = UserSubscription.objects.get(user=self.user)
+        self.assertTrue(subscription.is_active)
+        self.assertEqual(WebhookEvent.objects.get().result, WebhookEvent.Result.APPLIED)
+
+    def test_unknown_transaction_is_rejected_up_front(self):
+        response = self.deliver(provider_ref='ref-unknown')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_retried_delivery_is_short_circuited(self):
+        self.deliver()
+        end_date = UserSubscription.objects.get(user=self.user).end_date
+        # Fast path: one lookup on the event log, no writes.
+        with self.assertNumQueries(1):
+            response = self.deliver()
+        self.assertEqual(response.data['status'], 'Already received')
+        self.assertEqual(UserSubscription.objects.get(user=self.user).end_date, end_date)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_new_delivery_for_settled_transaction_is_ignored(self):
+        self.deliver()
+        end_date = UserSubscription.objects.get(user=self.user).end_date
+        self.deliver(status='FAILED', event_id='evt-2')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.SUCCESS)
+        self.assertEqual(UserSubscription.objects.get(user=self.user).end_date, end_date)
+        self.assertEqual(WebhookEvent.objects.get(delivery_id='evt-2').result, WebhookEvent.Result.IGNORED)
+
+    def test_event_is_applied_once(self):
+        self.deliver()
+        event = WebhookEvent.objects.get()
+        end_date = UserSubscription.objects.get(user=self.user).end_date
+        webhooks.process(event.id)
+        self.assertEqual(UserSubscription.objects.get(user=self.user).end_date, end_date)
+
+    def test_failure_is_recorded(self):
+        self.deliver(status='FAILED')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentTransaction.Status.FAILED)
+        self.assertFalse(UserSubscription.objects.exists())
+
+    def test_existing_subscription_is_renewed(self):
+        UserSubscription.objects.create(
+            user=self.user, plan=self.plan, end_date=timezone.now() - timedelta(days=1), is_active=False
+        )
+        self.deliver()
+        subscription = UserSubscription.objects.get(user=self.user)
+        self.assertTrue(subscription.is_active)
+        self.assertGreater(subscription.end_date, timezone.now() + timedelta(days=29))
+
+
+@override_settings(PAYMENT_WEBHOOKS=SYNC_WEBHOOKS)
+class WebhookRetryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00', duration_days=30)
+
+    def record(self, provider_ref):
+        # receive() turns unknown references away, so log the event directly.
+        return WebhookEvent.objects.create(
+            delivery_id='evt-1', provider_ref=provider_ref, next_attempt_at=timezone.now(),
+            payload={'provider_ref': provider_ref, 'status': 'SUCCESS'},
+        )
+
+    def test_failed_event_is_retried_with_backoff(self):
+        event = self.record('ref-1')
+        webhooks.attempt(event.id)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 1)
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.last_error, 'Transaction not found')
+        self.assertGreater(event.next_attempt_at, timezone.now() + timedelta(seconds=9))
+        self.assertEqual(drain(), 0)
+
+        PaymentTransaction.objects.create(user=self.user, plan=self.plan, amount=self.plan.price, provider_ref='ref-1')
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(drain(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.result, WebhookEvent.Result.APPLIED)
+        self.assertTrue(UserSubscription.objects.filter(user=self.user, is_active=True).exists())
+
+    def test_event_fails_after_max_attempts(self):
+        event = self.record('missing')
+        for _ in range(3):
+            webhooks.attempt(event.id)
+        event.refresh_from_db()
+        self.assertEqual(event.result, WebhookEvent.Result.FAILED)
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(webhooks.due_event_ids(limit=10, now=timezone.now() + timedelta(days=1)), [])
+
+
+class SubscriptionExpiryTests(APITestCase):
+    def setUp(self):
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00', duration_days=30)
+
+    def subscribe(self, days_left, auto_renew=False):
+        user = create_user()
+        return UserSubscription.objects.create(
+            user=user, plan=self.plan, end_date=timezone.now() + timedelta(days=days_left), auto_renew=auto_renew
+        )
+
+    def test_due_subscriptions_are_expired_in_batches(self):
+        due = [self.subscribe(-1) for _ in range(3)] + [self.subscribe(-2, auto_renew=True) for _ in range(2)]
+        current = self.subscribe(5, auto_renew=True)
+
+        self.assertEqual(expire_subscriptions(batch_size=2), (5, 2))
+
+        self.assertFalse(UserSubscription.objects.filter(id__in=[s.id for s in due], is_active=True).exists())
+        current.refresh_from_db()
+        self.assertTrue(current.is_active)
+        renewals = PaymentTransaction.objects.all()
+        self.assertEqual({payment.user_id for payment in renewals}, {s.user_id for s in due if s.auto_renew})
+        self.assertTrue(all(payment.status == PaymentTransaction.Status.PENDING for payment in renewals))
+        self.assertEqual(expire_subscriptions(), (0, 0))
+
+    def test_batch_costs_constant_queries(self):
+        def sweep(count):
+            for _ in range(count):
+                self.subscribe(-1, auto_renew=True)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(expire_subscriptions(batch_size=50), (count, count))
+            return len(queries.captured_queries)
+
+        self.assertEqual(sweep(2), sweep(8))
+
+
+class AnalyticsOnlyView(APIView):
+    permission_classes = [entitlements.HasFeature.of('analytics')]
+
+    def get(self, request):
+        return Response({'ok': True})
+
+
+@override_settings(PAYMENT_WEBHOOKS=SYNC_WEBHOOKS)
+class EntitlementTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        entitlements.local_cache.clear()
+        self.user = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00', features={'analytics': True})
+
+    def subscribe(self, days_left=30):
+        return UserSubscription.objects.create(
+            user=self.user, plan=self.plan, end_date=timezone.now() + timedelta(days=days_left)
+        )
+
+    def request_view(self):
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.user)
+        return AnalyticsOnlyView.as_view()(request)
+
+    def test_hot_path_skips_the_database(self):
+        self.subscribe()
+        self.assertTrue(entitlements.get_entitlements(self.user).has('analytics'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.request_view().status_code, 200)
+
+    def test_shared_cache_serves_other_processes(self):
+        self.subscribe()
+        entitlements.get_entitlements(self.user)
+        entitlements.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertTrue(entitlements.get_entitlements(self.user).has('analytics'))
+
+    def test_permission_denies_without_feature(self):
+        self.assertEqual(self.request_view().status_code, 403)
+
+    def test_webhook_invalidates(self):
+        self.assertFalse(entitlements.get_entitlements(self.user).has('analytics'))
+        PaymentTransaction.objects.create(user=self.user, plan=self.plan, amount=self.plan.price, provider_ref='ref-1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                '/api/payments/payments/webhook/',
+                {'provider_ref': 'ref-1', 'status': 'SUCCESS', 'event_id': 'evt-1'},
+                format='json',
+            )
+        self.assertTrue(entitlements.get_entitlements(self.user).has('analytics'))
+
+    def test_expiry_sweep_invalidates(self):
+        subscription = self.subscribe()
+        self.assertTrue(entitlements.get_entitlements(self.user).has('analytics'))
+        UserSubscription.objects.filter(pk=subscription.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            expire_subscriptions()
+        with self.assertNumQueries(1):
+            self.assertFalse(entitlements.get_entitlements(self.user).has('analytics'))
+
+    def test_lapsed_entry_stops_granting(self):
+        # Cached before the sweep got to it.
+        cache.set(entitlements.cache_key(self.user.pk), {
+            'plan_id': self.plan.pk, 'features': self.plan.features, 'ends_at': timezone.now().timestamp() - 60,
+        })
+        self.assertFalse(entitlements.get_entitlements(self.user).has('analytics'))
+
+
+class PaymentExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='provider', password='pass12345', role=User.Role.PROVIDER)
+        self.other = User.objects.create_user(username='other', password='pass12345', role=User.Role.PROVIDER)
+        self.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00')
+        for i, user in enumerate([self.user, self.user, self.other]):
+            PaymentTransaction.objects.create(user=user, plan=self.plan, amount=self.plan.price, provider_ref=f'ref-{i}')
+        PaymentTransaction.objects.filter(provider_ref='ref-0').update(created_at=timezone.now() - timedelta(days=10))
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_of_own_transactions(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/payments/payments/export/?format=csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['provider_ref'] for row in rows], ['ref-0', 'ref-1'])
+        self.assertEqual(rows[0]['plan'], 'Pro')
+
+    def test_jsonl_export_with_date_range(self):
+        self.client.force_authenticate(self.user)
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        response = self.client.get(f'/api/payments/payments/export/?format=jsonl&since={since}')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['provider_ref'] for row in rows], ['ref-1'])
+        self.assertEqual(rows[0]['amount'], '10.00')
+
+    def test_invalid_date_is_rejected(self):
+        self.client.force_authenticate(self.user)
+        for fmt in ('csv', 'jsonl'):
+            response = self.client.get(f'/api/payments/payments/export/?format={fmt}&until=yesterday')
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertIn('until', response.json())
+
+    def test_all_users_export_is_admin_only(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/payments/payments/export_all/')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.client.force_authenticate(self.admin)
+        lines = self.read(self.client.get('/api/payments/payments/export_all/?format=jsonl')).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_management_command(self):
+        out = io.StringIO()
+        call_command('export_payments', '--user', 'other', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual([row['username'] for row in rows], ['other'])
+
+
+# One worker: SQLite's shared in-memory test database can't take concurrent writers.
+@override_settings(
+    PAYMENT_RECONCILIATION={'STALE_AFTER_SECONDS': 600, 'BATCH_SIZE': 2, 'WORKERS': 1},
+    PAYMENT_WEBHOOKS=SYNC_WEBHOOKS,
+)
+class ReconciliationTests(TransactionTestCase):
+    # The thread pool uses its own connections, so rows must really be committed.
+
+    def setUp(self):
+        get_gateway().reset()
+        self.plan = SubscriptionPlan.objects.create(name='Pro', price='10.00', duration_days=30)
+        self.user = User.objects.create_user(username='provider', password='pass12345')
+
+    def tearDown(self):
+        get_gateway().reset()
+
+    def pending(self, ref, minutes_old):
+        payment = PaymentTransaction.objects.create(
+            user=self.user, plan=self.plan, amount=self.plan.price, provider_ref=ref
+        )
+        PaymentTransaction.objects.filter(pk=payment.pk).update(
+            created_at=timezone.now() - timedelta(minutes=minutes_old)
+        )
+        return payment
+
+    def test_stale_transactions_are_settled(self):
+        gateway = get_gateway()
+        for i in range(5):
+            self.pending(f'ref-{i}', minutes_old=30)
+        fresh = self.pending('fresh', minutes_old=1)
+        gateway.set_status('ref-0', 'SUCCESS')
+        gateway.set_status('ref-1', 'FAILED')
+        gateway.set_status('fresh', 'SUCCESS')
+
+        result = reconcile()
+
+        self.assertEqual(
+            {key: result.as_dict()[key] for key in ('scanned', 'succeeded', 'failed', 'pending', 'errors')},
+            {'scanned': 5, 'succeeded': 1, 'failed': 1, 'pending': 3, 'errors': 0},
+        )
+        statuses = dict(PaymentTransaction.objects.values_list('provider_ref', 'status'))
+        self.assertEqual(statuses['ref-0'], PaymentTransaction.Status.SUCCESS)
+        self.assertEqual(statuses['ref-1'], PaymentTransaction.Status.FAILED)
+        self.assertEqual(statuses['ref-2'], PaymentTransaction.Status.PENDING)
+        self.assertEqual(statuses[fresh.provider_ref], PaymentTransaction.Status.PENDING)
+        self.assertTrue(UserSubscription.objects.get(user=self.user).is_active)
+        self.assertGreaterEqual(result.per_second, 0)
+
+    def test_transaction_settled_by_webhook_is_not_reapplied(self):
+        payment = self.pending('ref-0', minutes_old=30)
+        get_gateway().set_status('ref-0', 'SUCCESS')
+        # The webhook lands after the scan picked the transaction up.
+        event, _ = webhooks.receive('evt-1', 'ref-0', {'provider_ref': 'ref-0', 'status': 'SUCCESS'})
+        webhooks.process(event.id)
+        end_date = UserSubscription.objects.get(user=self.user).end_date
+
+        self.assertIsNone(reconcile_one(payment.id, 'ref-0'))
+        self.assertEqual(UserSubscription.objects.get(user=self.user).end_date, end_date)
+        self.assertEqual(reconcile().scanned, 0)
@@ -1,10 +1,10 @@
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.utils import timezone
-from datetime import timedelta
 import uuid
-from .models import SubscriptionPlan, UserSubscription, PaymentTransaction
+from django.http import StreamingHttpResponse
+from . import exports, webhooks, worker
+from .models import SubscriptionPlan, PaymentTransaction
 from .serializers import (
     SubscriptionPlanSerializer, 
     UserSubscriptionSerializer, 
@@ -12,6 +12,7 @@ from .serializers import (
     InitiatePaymentSerializer
 )
 from django.contrib.auth import get_user_model
+from food_connect_project.pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -66,38 +67,56 @@ class PaymentViewSet(viewsets.ViewSet):
         if not provider_ref or not status_update:
             return Response({'error': 'Invalid data'}, status=400)
 
+        # Record and acknowledge only; payments.worker applies the event, so
+        # the gateway never waits on (or retries because of) slow writes.
         try:
-            transaction = PaymentTransaction.objects.get(provider_ref=provider_ref)
-        except PaymentTransaction.DoesNotExist:
-            return Response({'error': 'Transaction not found'}, status=404)
-
-        if status_update == 'SUCCESS':
-            transaction.status = PaymentTransaction.Status.SUCCESS
-            transaction.save()
-
-            # Activate Subscription
-            plan = transaction.plan
-            end_date = timezone.now() + timedelta(days=plan.duration_days)
-            
-            UserSubscription.objects.update_or_create(
-                user=transaction.user,
-                defaults={
-                    'plan': plan,
-                    'end_date': end_date,
-                    'is_active': True
-                }
+            event, created = webhooks.receive(
+                webhooks.delivery_id_for(request), provider_ref, webhooks.payload_of(request)
             )
-            return Response({'status': 'Subscription activated'})
-        
-        transaction.status = PaymentTransaction.Status.FAILED
-        transaction.save()
-        return Response({'status': 'Payment failed recorded'})
+        except webhooks.WebhookError as exc:
+            return Response({'error': str(exc)}, status=404)
+        if not created:
+            return Response({'status': 'Already received'})
+        worker.enqueue(event.id)
+        return Response({'status': 'Accepted'}, status=status.HTTP_202_ACCEPTED)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # Export errors (bad range, no permission) would otherwise be labelled text/csv.
+        return exports.json_errors(response) if isinstance(response, Response) else response
+
+    def get_history_queryset(self):
+        return PaymentTransaction.objects.filter(user=self.request.user).select_related('plan')
 
     @action(detail=False, methods=['get'])
     def history(self, request):
-        transactions = PaymentTransaction.objects.filter(user=request.user)
-        serializer = PaymentTransactionSerializer(transactions, many=True)
-        return Response(serializer.data)
+        transactions = self.get_history_queryset()
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(transactions, request, view=self)
+        serializer = PaymentTransactionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def stream_export(self, request, queryset, filename):
+        queryset = exports.filter_range(
+            queryset, request.query_params.get('since'), request.query_params.get('until')
+        )
+        fmt = request.accepted_renderer.format
+        response = StreamingHttpResponse(exports.export(queryset, fmt), content_type=exports.CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+        return response
+
+    @action(detail=False, methods=['get'], renderer_classes=[exports.CSVRenderer, exports.JSONLinesRenderer])
+    def export(self, request):
+        return self.stream_export(request, PaymentTransaction.objects.filter(user=request.user), 'payments')
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAdminUser],
+        renderer_classes=[exports.CSVRenderer, exports.JSONLinesRenderer],
+    )
+    def export_all(self, request):
+        return self.stream_export(request, PaymentTransaction.objects.all(), 'all-payments')
 
     @action(detail=False, methods=['get'], url_path='mock_gateway/(?P<ref>[^/.]+)')
     def mock_gateway(self, request, ref=None):
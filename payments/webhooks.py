@@ -0,0 +1,178 @@
+"""
+Idempotent payment webhook processing.
+
+Gateways retry deliveries until they see a 2xx, and bursts of retries for
+the same event can arrive concurrently. The webhook view only records each
+delivery in WebhookEvent under its unique delivery id and acknowledges it;
+``payments.worker`` applies it afterwards. A delivery that was already
+received is answered from the event log with a single indexed lookup.
+
+Applying an event writes the event, the transaction and the user's
+subscription in one atomic block holding row locks on the event and the
+transaction, so concurrent workers can't apply it twice. A transaction that
+has already left PENDING ignores later events, so two different deliveries
+for the same payment can't extend a subscription twice either.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import entitlements
+from .models import PaymentTransaction, UserSubscription, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def get_webhook_setting(name):
+    defaults = {
+        # False applies events synchronously on commit (handy in tests).
+        'ASYNC': True,
+        'WORKERS': 4,
+        'MAX_ATTEMPTS': 6,
+        # Retry n waits BACKOFF_SECONDS * 2 ** (n - 1).
+        'BACKOFF_SECONDS': 5,
+        # How often idle workers look for due retries in the table.
+        'POLL_SECONDS': 5,
+    }
+    return getattr(settings, 'PAYMENT_WEBHOOKS', {}).get(name, defaults[name])
+
+
+class WebhookError(Exception):
+    pass
+
+
+def delivery_id_for(request):
+    """
+    The gateway's delivery id, from the ``Webhook-Id`` header or the
+    ``event_id`` field. Without one, the same ref and status count as the
+    same delivery.
+    """
+    delivery_id = request.headers.get('Webhook-Id') or request.data.get('event_id')
+    if delivery_id:
+        return str(delivery_id)
+    return f"{request.data.get('provider_ref')}:{request.data.get('status')}"
+
+
+def payload_of(request):
+    data = request.data
+    return data.dict() if hasattr(data, 'dict') else dict(data)
+
+
+def receive(delivery_id, provider_ref, payload):
+    """
+    Record a delivery and return ``(event, created)``. ``created`` is False
+    for a delivery id that is already in the log, whatever its state. Raises
+    WebhookError for an unknown transaction, which retrying can't fix.
+    """
+    event = WebhookEvent.objects.filter(delivery_id=delivery_id).first()
+    if event is not None:
+        return event, False
+    if not PaymentTransaction.objects.filter(provider_ref=provider_ref).exists():
+        raise WebhookError('Transaction not found')
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.create(
+                delivery_id=delivery_id, provider_ref=provider_ref, payload=payload, next_attempt_at=timezone.now()
+            )
+    except IntegrityError:
+        # A concurrent retry of the same delivery won the insert.
+        return WebhookEvent.objects.get(delivery_id=delivery_id), False
+    return event, True
+
+
+def process(event_id):
+    """
+    Apply a recorded event exactly once and return it. ``event.result`` is
+    APPLIED when it settled the transaction and IGNORED when the transaction
+    had already been settled by another event. Raises WebhookError when the
+    transaction doesn't exist; nothing is written in that case.
+    """
+    with transaction.atomic():
+        event = WebhookEvent.objects.select_for_update().get(pk=event_id)
+        if event.processed_at is not None:
+            # Another worker got the lock first and finished.
+            return event
+
+        try:
+            payment = PaymentTransaction.objects.select_for_update(of=('self',)).select_related('plan').get(
+                provider_ref=event.provider_ref
+            )
+        except PaymentTransaction.DoesNotExist:
+            raise WebhookError('Transaction not found')
+
+        if payment.status == PaymentTransaction.Status.PENDING:
+            settle(payment, event.payload.get('status'))
+            event.result = WebhookEvent.Result.APPLIED
+        else:
+            event.result = WebhookEvent.Result.IGNORED
+        event.processed_at = timezone.now()
+        event.next_attempt_at = None
+        event.save(update_fields=['result', 'processed_at', 'next_attempt_at'])
+    return event
+
+
+def attempt(event_id):
+    """
+    ``process()`` the event, recording a failure instead of raising: the
+    event is retried with exponential backoff and marked FAILED after
+    MAX_ATTEMPTS. Returns the event.
+    """
+    try:
+        return process(event_id)
+    except Exception as exc:
+        if not isinstance(exc, WebhookError):
+            logger.exception('Failed to process webhook event %s', event_id)
+        event = WebhookEvent.objects.get(pk=event_id)
+        event.attempts += 1
+        event.last_error = str(exc)[:1000]
+        now = timezone.now()
+        if event.attempts >= get_webhook_setting('MAX_ATTEMPTS'):
+            event.result = WebhookEvent.Result.FAILED
+            event.processed_at = now
+            event.next_attempt_at = None
+        else:
+            delay = get_webhook_setting('BACKOFF_SECONDS') * 2 ** (event.attempts - 1)
+            event.next_attempt_at = now + timedelta(seconds=delay)
+        event.save(update_fields=['attempts', 'last_error', 'result', 'processed_at', 'next_attempt_at'])
+        return event
+
+
+def due_event_ids(limit, now=None):
+    """Ids of unprocessed events whose next attempt is due, oldest first."""
+    return list(
+        WebhookEvent.objects
+        .filter(processed_at__isnull=True, next_attempt_at__lte=now or timezone.now())
+        .order_by('next_attempt_at')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def settle(payment, status):
+    if status == PaymentTransaction.Status.SUCCESS:
+        payment.status = PaymentTransaction.Status.SUCCESS
+        payment.save(update_fields=['status', 'updated_at'])
+        activate_subscription(payment)
+    else:
+        payment.status = PaymentTransaction.Status.FAILED
+        payment.save(update_fields=['status', 'updated_at'])
+
+
+def activate_subscription(payment):
+    end_date = timezone.now() + timedelta(days=payment.plan.duration_days)
+    entitlements.invalidate_on_commit(payment.user_id)
+    updated = UserSubscription.objects.filter(user_id=payment.user_id).update(
+        plan=payment.plan, end_date=end_date, is_active=True
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            UserSubscription.objects.create(user_id=payment.user_id, plan=payment.plan, end_date=end_date)
+    except IntegrityError:
+        # Another payment for the same user created it first.
+        UserSubscription.objects.filter(user_id=payment.user_id).update(
+            plan=payment.plan, end_date=end_date, is_active=True
+        )
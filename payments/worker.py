@@ -0,0 +1,101 @@
+"""
+Background processing of received payment webhooks.
+
+The WebhookEvent table is the queue: the view inserts a row and returns, and
+a pool of ``WORKERS`` daemon threads applies it. New events are handed to
+the pool on commit through an in-memory queue so they are picked up
+immediately; idle workers also poll the table every ``POLL_SECONDS`` for
+retries that have come due and for events left behind by a process that
+died. ``python manage.py process_webhooks`` drains the same table from cron
+or a dedicated process.
+"""
+import logging
+import queue
+import threading
+
+from django.db import close_old_connections, transaction
+
+from . import webhooks
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookWorkerPool:
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        # Ids in the queue or being attempted, so polling doesn't queue them twice.
+        self._pending = set()
+
+    def submit(self, event_id):
+        if not webhooks.get_webhook_setting('ASYNC'):
+            webhooks.attempt(event_id)
+            return
+        self._ensure_workers()
+        self._put(event_id)
+
+    def flush(self):
+        """Block until every submitted event has been attempted."""
+        self.queue.join()
+
+    def _put(self, event_id):
+        with self._lock:
+            if event_id in self._pending:
+                return
+            self._pending.add(event_id)
+        self.queue.put(event_id)
+
+    def _ensure_workers(self):
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            for i in range(len(self._workers), webhooks.get_webhook_setting('WORKERS')):
+                worker = threading.Thread(target=self._run, name=f'payment-webhooks-{i}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            try:
+                event_id = self.queue.get(timeout=webhooks.get_webhook_setting('POLL_SECONDS'))
+            except queue.Empty:
+                self._poll()
+                continue
+            try:
+                webhooks.attempt(event_id)
+            except Exception:
+                logger.exception('Failed to record webhook event %s attempt', event_id)
+            finally:
+                close_old_connections()
+                with self._lock:
+                    self._pending.discard(event_id)
+                self.queue.task_done()
+
+    def _poll(self):
+        try:
+            for event_id in webhooks.due_event_ids(limit=webhooks.get_webhook_setting('WORKERS')):
+                self._put(event_id)
+        except Exception:
+            logger.exception('Failed to poll for due webhook events')
+        finally:
+            close_old_connections()
+
+
+pool = WebhookWorkerPool()
+
+
+def enqueue(event_id):
+    """Hand ``event_id`` to the worker pool once the current transaction commits."""
+    transaction.on_commit(lambda: pool.submit(event_id))
+
+
+def drain(batch_size=100):
+    """Attempt every due event in this thread; returns the number attempted."""
+    attempted = 0
+    while True:
+        event_ids = webhooks.due_event_ids(limit=batch_size)
+        for event_id in event_ids:
+            webhooks.attempt(event_id)
+        attempted += len(event_ids)
+        if len(event_ids) < batch_size:
+            return attempted
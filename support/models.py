@@ -17,5 +17,11 @@ class SupportTicket(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='ticket_created_id_idx'),
+            models.Index(fields=['user', 'created_at', 'id'], name='ticket_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.subject}"
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 class User(AbstractUser):
@@ -13,6 +14,15 @@ class User(AbstractUser):
     organization_name = models.CharField(max_length=255, blank=True, null=True)
     verification_document = models.FileField(upload_to='verification_docs/', blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # Where a seeker collects food from; drives distance in listing recommendations.
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_joined_id_idx'),
+            models.Index(fields=['role', 'latitude', 'longitude'], name='user_role_location_idx'),
+        ]
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -29,7 +29,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
-        fields = ('id', 'username', 'email', 'role', 'phone_number', 'address', 'organization_name', 'verification_document', 'is_verified')
+        fields = ('id', 'username', 'email', 'role', 'phone_number', 'address', 'latitude', 'longitude', 'organization_name', 'verification_document', 'is_verified')
 
 class AdminUserSerializer(serializers.ModelSerializer):
     class Meta:
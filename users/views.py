@@ -21,6 +21,7 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer # Default, overridden in methods
     permission_classes = (permissions.IsAdminUser,)
+    pagination_ordering = ('-date_joined', '-id')
 
     def get_serializer_class(self):
         from .serializers import AdminUserSerializer